@@ -1,4 +1,6 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -18,6 +20,9 @@ from src.api.state.startup import record_startup_event
 
 logger = logging.getLogger("app")
 
+# Blocking DB/SDK calls all go through run_in_executor; the stock default pool is too small for that
+_DEFAULT_EXECUTOR_WORKERS = 32
+
 print("DEBUG: Initializing service registry...")
 def _bootstrap_services():
     created = {}
@@ -75,6 +80,8 @@ async def lifespan(app: FastAPI):
     print("LIFESPAN: Starting up...")
     configure_logging()
     logger.info("Starting Mental Trader Web Interface...")
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=_DEFAULT_EXECUTOR_WORKERS, thread_name_prefix="default-executor"))
     
     # Check if any services are available
     created = _bootstrap_services()
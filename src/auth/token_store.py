@@ -13,6 +13,8 @@ IST = pytz.timezone('Asia/Kolkata')
 
 _lock = threading.Lock()
 _store_file = os.path.join(os.path.dirname(__file__), '../data/token_store.json')
+# (store file mtime_ns, access_token) from the last read; save_token resets it
+_token_cache = None
 
 def _ensure_file():
     d = os.path.dirname(_store_file)
@@ -23,7 +25,9 @@ def _ensure_file():
             json.dump({}, f)
 
 def save_token(token_data: dict):
+    global _token_cache
     with _lock:
+        _token_cache = None
         _ensure_file()
         
         # Calculate custom expiry: next day's 3:30 AM IST or day after
@@ -51,11 +55,18 @@ def save_token(token_data: dict):
         logger.info("Token saved to %s, expires at %s IST", _store_file, expiry.isoformat())
 
 def get_token() -> str:
+    """Access token from the store; the file is only re-read when its mtime changes."""
+    global _token_cache
     with _lock:
         _ensure_file()
+        mtime = os.stat(_store_file).st_mtime_ns
+        if _token_cache is not None and _token_cache[0] == mtime:
+            return _token_cache[1]
         with open(_store_file, "r") as f:
             data = json.load(f)
-    return data.get("access_token", "")
+        token = data.get("access_token", "")
+        _token_cache = (mtime, token)
+    return token
 
 def get_token_expiry() -> dict:
     """Get token expiry information."""
@@ -110,6 +110,7 @@ class Settings(BaseSettings):
     GAP_FILL_ENABLED: bool = Field(True, env="GAP_FILL_ENABLED")
     CLEANUP_ENABLED: bool = Field(True, env="CLEANUP_ENABLED")
     MAINTENANCE_INTERVAL_HOURS: int = Field(24, env="MAINTENANCE_INTERVAL_HOURS")
+    BACKFILL_CONCURRENCY: int = Field(8, env="BACKFILL_CONCURRENCY")  # historical fetches in flight during backfill
 
     # Application
     APP_PORT: int = Field(8000, env="APP_PORT")
@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Tuple
+
+import numpy as np
 
 
 @dataclass
@@ -64,3 +66,50 @@ class EMAState:
             self.long_ema = close_price
         else:
             self.long_ema = self._ema_step(close_price, self.long_ema, self.long_period)
+
+    def warmup_from_array(self, closes: np.ndarray):
+        """Equivalent to calling update_with_close for each close in order, without the Python loop."""
+        closes = np.asarray(closes, dtype=np.float64)
+        if not closes.size:
+            return
+        self.prev_short, self.short_ema = self._ema_fold(closes, self.short_ema, self.short_period)
+        self.prev_long, self.long_ema = self._ema_fold(closes, self.long_ema, self.long_period)
+
+    def stream_from_array(self, closes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Fold closes like repeated update_with_close; returns (short, long) EMA arrays, one value per bar.
+
+        The EMA before bar i is element i-1 (or the pre-call state for i == 0), so crossover tests can
+        run as array comparisons afterwards.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if not closes.size:
+            return np.empty(0), np.empty(0)
+        a_s = 2.0 / (self.short_period + 1)
+        a_l = 2.0 / (self.long_period + 1)
+        s, l = self.short_ema, self.long_ema
+        prev_s, prev_l = s, l
+        short_out, long_out = [], []
+        # A scalar recurrence: one tight loop over floats, with the same arithmetic as _ema_step
+        for c in closes.tolist():
+            prev_s, prev_l = s, l
+            s = c if s is None else a_s * c + (1 - a_s) * s
+            l = c if l is None else a_l * c + (1 - a_l) * l
+            short_out.append(s)
+            long_out.append(l)
+        self.prev_short, self.prev_long = prev_s, prev_l
+        self.short_ema, self.long_ema = s, l
+        return np.array(short_out), np.array(long_out)
+
+    def _ema_fold(self, closes: np.ndarray, ema, period: int):
+        """(prev, last) EMA after folding closes into ema; None seeds from the first close."""
+        if ema is None:
+            ema, closes = float(closes[0]), closes[1:]
+            if not closes.size:
+                return None, ema
+        alpha = 2.0 / (period + 1)
+        # Closed form of folding head into ema: decay^h * ema + alpha * sum_j decay^(h-1-j) * head[j]
+        head = closes[:-1]
+        decay = 1.0 - alpha
+        weights = decay ** np.arange(head.size - 1, -1, -1, dtype=np.float64)
+        prev = decay ** head.size * ema + alpha * float(weights @ head)
+        return prev, self._ema_step(float(closes[-1]), prev, period)
@@ -209,7 +209,7 @@ class OpeningRangeBreakoutStrategy(BaseStrategy):
                         st['range_complete'] = True
                         logger.info(f"(Late start) Reconstructed opening range for {symbol}: high={st['range_high']} low={st['range_low']}")
                         if self.service.options_manager:
-                            chain = self.service.options_manager.provider.fetch_option_chain()
+                            chain = await self.service.options_manager.provider.fetch_option_chain()
                             baseline = self._aggregate_baseline_oi(chain, getattr(bar, 'close', None))
                             st['baseline_call_oi'] = baseline['call']
                             st['baseline_put_oi'] = baseline['put']
@@ -235,7 +235,7 @@ class OpeningRangeBreakoutStrategy(BaseStrategy):
                 logger.info(f"Opening range complete for {symbol}: high={st['range_high']} low={st['range_low']}")
                 # baseline OI snapshot
                 if self.service.options_manager:
-                    chain = self.service.options_manager.provider.fetch_option_chain()
+                    chain = await self.service.options_manager.provider.fetch_option_chain()
                     spot = bar.close
                     baseline = self._aggregate_baseline_oi(chain, spot)
                     st['baseline_call_oi'] = baseline['call']
@@ -293,7 +293,7 @@ class OpeningRangeBreakoutStrategy(BaseStrategy):
 
         # OI Change
         if self.service.options_manager:
-            chain = self.service.options_manager.provider.fetch_option_chain()
+            chain = await self.service.options_manager.provider.fetch_option_chain()
             spot = bar.close
             curr = self._aggregate_baseline_oi(chain, spot)
             if side == 'BUY':
@@ -5,6 +5,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
+import numpy as np
+
 
 @dataclass
 class Candle:
@@ -31,6 +33,49 @@ class Candle:
 		}
 
 
+# Row layout for candle structured arrays: ts as received, float64 prices, int64 volume
+CANDLE_DTYPE = np.dtype([
+	("ts", object),
+	("open", np.float64),
+	("high", np.float64),
+	("low", np.float64),
+	("close", np.float64),
+	("volume", np.int64),
+])
+
+
+@dataclass
+class CandleColumns:
+	"""Chronological candles as contiguous column arrays for vectorized analytics.
+
+	Prices are float32 to match the REAL columns they are stored in.
+	"""
+	ts: np.ndarray
+	open: np.ndarray
+	high: np.ndarray
+	low: np.ndarray
+	close: np.ndarray
+	volume: np.ndarray
+
+	def __len__(self):
+		return len(self.close)
+
+	@classmethod
+	def from_rows(cls, rows):
+		"""Build from (ts, open, high, low, close, volume) tuples."""
+		if not rows:
+			return cls(np.empty(0, dtype=object), *(np.empty(0, dtype=np.float32) for _ in range(4)), np.empty(0, dtype=np.int64))
+		ts, o, h, l, c, v = zip(*rows)
+		return cls(
+			ts=np.array(ts, dtype=object),
+			open=np.asarray(o, dtype=np.float32),
+			high=np.asarray(h, dtype=np.float32),
+			low=np.asarray(l, dtype=np.float32),
+			close=np.asarray(c, dtype=np.float32),
+			volume=np.asarray([x or 0 for x in v], dtype=np.int64)
+		)
+
+
 @dataclass
 class Trade:
 	"""Represents a trade record."""
@@ -1,9 +1,9 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class OptionContract:
     symbol: str
     strike: int
@@ -21,6 +21,7 @@ class OptionContract:
     theta: Optional[float] = None
     vega: Optional[float] = None
     trading_symbol: Optional[str] = None
+    rho: Optional[float] = None
 
     @property
     def oi_change(self) -> Optional[int]:
@@ -62,5 +63,5 @@ class OptionSignal:
     stop_loss_premium: float
     target_premium: float
     metrics_snapshot: Dict[str, float]
-    reasoning: List[str]
+    reasoning: Dict[str, float]
     timestamp: datetime
@@ -1,17 +1,30 @@
+import asyncio
+import csv
+import io
 import logging
 from datetime import datetime
-from typing import List
+from operator import attrgetter
+from typing import Dict, List, Optional, Tuple
 
 # Simple SQLAlchemy-only approach
 try:
     import sqlalchemy
-    from sqlalchemy import (Column, DateTime, Float, Integer, MetaData, String,
-                            Table, UniqueConstraint, create_engine, text)
+    from sqlalchemy import (JSON, REAL, Column, DateTime, Float, Index,
+                            Integer, MetaData, String, Table, UniqueConstraint,
+                            bindparam, create_engine, extract, func, select,
+                            text)
+    from sqlalchemy.dialects.postgresql import JSONB
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.pool import StaticPool
+    from sqlalchemy.types import NullType
     DATABASE_AVAILABLE = True
 except ImportError:
     sqlalchemy = None
     DATABASE_AVAILABLE = False
 
+from src.models.candle_models import CandleColumns
+from src.utils.ids import uuid7_str
+
 logger = logging.getLogger("database")
 
 if DATABASE_AVAILABLE:
@@ -25,13 +38,23 @@ if DATABASE_AVAILABLE:
         Column('instrument_key', String, primary_key=True),
         Column('timeframe', String, primary_key=True),
         Column('ts', DateTime(timezone=True), primary_key=True),  # raw ISO8601 with offset
-        Column('open', Float),
-        Column('high', Float),
-        Column('low', Float),
-        Column('close', Float),
+        # 4-byte floats: ample precision for exchange ticks and a narrower row than double precision
+        Column('open', REAL),
+        Column('high', REAL),
+        Column('low', REAL),
+        Column('close', REAL),
         Column('volume', Integer),
         UniqueConstraint('instrument_key', 'ts', name='uq_candles_inst_ts')
     )
+    # Newest-first lookups per series (load_candles) become a backward index range scan
+    Index('ix_candles_sit_ts_desc', candles.c.symbol, candles.c.instrument_key, candles.c.timeframe, candles.c.ts.desc())
+
+    # One row per symbol ever persisted; avoids DISTINCT over the whole candles table
+    symbols = Table(
+        'symbols', metadata,
+        Column('symbol', String, primary_key=True),
+        Column('first_seen', DateTime, server_default=func.now())
+    )
 
     ema_state = Table(
         'ema_state', metadata,
@@ -68,25 +91,111 @@ if DATABASE_AVAILABLE:
         Column('size_lots', Integer),
         Column('stop_loss_premium', Float),
         Column('target_premium', Float),
-        Column('reasoning', String),
+        Column('reasoning', JSON().with_variant(JSONB(), 'postgresql')),
         Column('entry_order_id', String),
         Column('stop_order_id', String),
         Column('target_order_id', String),
         Column('status', String, default='OPEN'),
         Column('created_at', DateTime, server_default=text('now()'))
     )
+
+    # Hot-path statements built once so SQLAlchemy's compiled cache is hit on every write
+    _CANDLE_UPSERT = text("""
+        INSERT INTO candles (symbol, instrument_key, timeframe, ts, open, high, low, close, volume)
+        VALUES (:symbol, :instrument_key, :timeframe, :ts, :open, :high, :low, :close, :volume)
+        ON CONFLICT (instrument_key, ts) DO UPDATE SET
+            symbol = EXCLUDED.symbol,
+            timeframe = EXCLUDED.timeframe,
+            open = EXCLUDED.open,
+            high = EXCLUDED.high,
+            low = EXCLUDED.low,
+            close = EXCLUDED.close,
+            volume = EXCLUDED.volume
+    """)
+    _EMA_STATE_UPSERT = text("""
+        INSERT INTO ema_state (symbol, instrument_key, timeframe, period, ema_value, last_ts)
+        VALUES (:symbol, :instrument_key, :timeframe, :period, :ema_value, :last_ts)
+        ON CONFLICT (symbol, instrument_key, timeframe, period) DO UPDATE SET
+            ema_value = EXCLUDED.ema_value,
+            last_ts = EXCLUDED.last_ts
+    """)
+    # COPY path: stage rows in a session temp table, then merge with a single ON CONFLICT statement
+    _CANDLE_STAGE_DDL = (
+        "CREATE TEMP TABLE IF NOT EXISTS candles_stage "
+        "(LIKE candles INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    )
+    _CANDLE_STAGE_COPY = (
+        "COPY candles_stage (symbol, instrument_key, timeframe, ts, open, high, low, close, volume) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    _CANDLE_STAGE_MERGE = """
+        INSERT INTO candles (symbol, instrument_key, timeframe, ts, open, high, low, close, volume)
+        SELECT DISTINCT ON (instrument_key, ts) symbol, instrument_key, timeframe, ts, open, high, low, close, volume
+        FROM candles_stage
+        ORDER BY instrument_key, ts
+        ON CONFLICT (instrument_key, ts) DO UPDATE SET
+            symbol = EXCLUDED.symbol,
+            timeframe = EXCLUDED.timeframe,
+            open = EXCLUDED.open,
+            high = EXCLUDED.high,
+            low = EXCLUDED.low,
+            close = EXCLUDED.close,
+            volume = EXCLUDED.volume
+    """
+    _SYMBOL_INSERT = text("INSERT INTO symbols (symbol) VALUES (:symbol) ON CONFLICT (symbol) DO NOTHING")
+    _TRADE_INSERT = trades.insert()
+    _OPTION_TRADE_INSERT = option_trades.insert()
 else:
     metadata = None
     candles = None
+    symbols = None
     ema_state = None  
     trades = None
     option_trades = None
 
+def _engine_kwargs(url: str) -> dict:
+    """Engine options; in-memory SQLite must share one connection across executor threads."""
+    if url.startswith("sqlite"):
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+            return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+        return {}
+    # Server databases: keep a warm pool sized for per-bar writes across many symbols
+    kwargs = {"pool_size": 16, "max_overflow": 32, "pool_pre_ping": True, "pool_recycle": 1800}
+    if make_url(url).get_dialect().driver == "psycopg2":
+        # psycopg2 executemany is a per-row loop; batch it into pages of statements
+        kwargs["executemany_mode"] = "values_plus_batch"
+    return kwargs
+
+_CANDLE_FIELDS = ('ts', 'open', 'high', 'low', 'close', 'volume')
+_bar_attrs = attrgetter(*_CANDLE_FIELDS)
+
+
+def _bar_items(b: dict) -> tuple:
+    return tuple(b.get(f) for f in _CANDLE_FIELDS)
+
+def _candle_rows(symbol, instrument_key, timeframe, bars) -> List[dict]:
+    """Upsert parameter dicts for one series of bars."""
+    # Batches are homogeneous (all dicts or all bar objects): pick the extractor once
+    extract = _bar_items if isinstance(bars[0], dict) else _bar_attrs
+    series = {'symbol': symbol, 'instrument_key': instrument_key, 'timeframe': timeframe}
+    return [dict(zip(_CANDLE_FIELDS, extract(b)), **series) for b in bars]
+
+# Write-behind buffer for per-bar candle writes: flush every interval or once this many bars queue up
+_CANDLE_FLUSH_INTERVAL_SEC = 0.25
+_CANDLE_FLUSH_MAX_PENDING = 500
+
 class Database:
+    # Connected instances shared per URL (see Database.get)
+    _instances: Dict[str, "Database"] = {}
+
     def __init__(self, url: str):
         self.url = url
         self.engine = None
         self._connected = False
+        self._pending: List[Tuple] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_wakeup: Optional[asyncio.Event] = None
+        self._flush_stopping = False
         
         if not DATABASE_AVAILABLE:
             logger.warning("SQLAlchemy not installed. Running in memory-only mode.")
@@ -94,7 +203,7 @@ class Database:
         
         # Create simple engine
         try:
-            self.engine = create_engine(url)
+            self.engine = create_engine(url, **_engine_kwargs(url))
             if metadata:
                 metadata.create_all(self.engine)
             logger.info("Database engine created successfully")
@@ -102,6 +211,46 @@ class Database:
             logger.warning(f"Database creation failed: {e}")
             self.engine = None
 
+    @classmethod
+    async def get(cls, url: str) -> "Database":
+        """Return the process-wide connected Database for url, creating it on first use.
+
+        Scripts invoked repeatedly share one engine (and its warm connection pool) instead of
+        building and tearing one down per run; pair with atexit.register(Database.close_all).
+        """
+        db = cls._instances.get(url)
+        if db is None:
+            db = cls._instances[url] = cls(url)
+        # A previous event loop may have ended (asyncio.run), taking the flush task with it
+        if not db._connected or db._flush_task is None or db._flush_task.done():
+            await db.connect()
+        return db
+
+    @classmethod
+    def close_all(cls):
+        """Flush buffered candles and dispose the engines of every shared instance; safe to call from atexit."""
+        for db in cls._instances.values():
+            if db._pending:
+                try:
+                    asyncio.get_running_loop()
+                except RuntimeError:
+                    asyncio.run(db.flush_candles())
+                else:
+                    # Can't block on a flush inside a running loop; callers there should await disconnect() first
+                    logger.warning(f"Closing database with {len(db._pending)} unflushed candles")
+            db._connected = False
+            if db.engine is not None:
+                db.engine.dispose()
+        cls._instances.clear()
+
+    def _get_conn(self):
+        """Check out a pooled connection inside a transaction (commit on success, rollback on error)."""
+        return self.engine.begin()
+
+    async def _run_sync(self, fn):
+        """Run a blocking SQLAlchemy call in the default executor so the event loop keeps running."""
+        return await asyncio.get_running_loop().run_in_executor(None, fn)
+
     async def connect(self):
         if not DATABASE_AVAILABLE or not self.engine:
             logger.warning("Database not available")
@@ -109,46 +258,113 @@ class Database:
             
         try:
             # Test connection
-            with self.engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
+            def _ping():
+                with self._get_conn() as conn:
+                    conn.execute(text("SELECT 1"))
+                    # Databases created before the symbols table: seed it once from candles
+                    if conn.execute(select(symbols.c.symbol).limit(1)).first() is None:
+                        seen = select(symbols.c.symbol)
+                        conn.execute(symbols.insert().from_select(
+                            ['symbol'], select(candles.c.symbol).distinct().where(candles.c.symbol.not_in(seen))))
+            await self._run_sync(_ping)
             self._connected = True
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_wakeup = asyncio.Event()
+                self._flush_stopping = False
+                self._flush_task = asyncio.create_task(self._flush_loop())
             logger.info("Database connected successfully")
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             self._connected = False
 
     async def disconnect(self):
+        if self._flush_task:
+            if not self._flush_task.done():
+                # Let the loop finish any in-progress flush and exit; cancelling it could drop bars mid-write
+                self._flush_stopping = True
+                self._flush_wakeup.set()
+                await self._flush_task
+            self._flush_task = None
+        await self.flush_candles()
         self._connected = False
         logger.info("Database disconnected")
 
+    async def _flush_loop(self):
+        """Drain the candle write-behind buffer on a short interval or when it fills up."""
+        while not self._flush_stopping:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), timeout=_CANDLE_FLUSH_INTERVAL_SEC)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            try:
+                await self.flush_candles()
+            except Exception:
+                # Keep the flusher alive; the unwritten bars were requeued for the next pass
+                logger.exception("Candle flush failed")
+
+    async def flush_candles(self):
+        """Write all buffered candles, one bulk upsert per (symbol, instrument_key, timeframe)."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        groups = {}
+        for symbol, instrument_key, timeframe, bar in pending:
+            # Keyed by ts so a bar updated twice before a flush is written once (last value wins)
+            ts = _bar_items(bar)[0] if isinstance(bar, dict) else bar.ts
+            groups.setdefault((symbol, instrument_key, timeframe), {})[ts] = bar
+        items = list(groups.items())
+        written = 0
+        try:
+            for (symbol, instrument_key, timeframe), bars in items:
+                await self.persist_candles_bulk(symbol, instrument_key, timeframe, list(bars.values()))
+                written += 1
+        finally:
+            if written < len(items):
+                # Interrupted (e.g. cancelled): requeue unwritten groups ahead of newer bars; upserts make a retry safe
+                self._pending[:0] = [(symbol, instrument_key, timeframe, bar)
+                                     for (symbol, instrument_key, timeframe), bars in items[written:]
+                                     for bar in bars.values()]
+
     async def execute(self, query):
         """Execute a SQLAlchemy query and return the result."""
         if not self._connected or not self.engine:
             raise RuntimeError("Database not connected")
         
         try:
-            with self.engine.connect() as conn:
-                result = conn.execute(query)
-                conn.commit()  # Commit any changes
-                return result
+            def _execute():
+                with self._get_conn() as conn:
+                    result = conn.execute(query)
+                    return result
+            return await self._run_sync(_execute)
         except Exception as e:
             logger.error(f"Database query execution failed: {e}")
             raise
 
-    async def load_candles(self, symbol, instrument_key, timeframe, limit=200):
+    def _latest_candles_query(self, columns, symbol, instrument_key, timeframe, limit, before_ts=None):
+        """Newest-first candles for one series; before_ts pages backwards (keyset) without OFFSET."""
+        cond = (
+            (candles.c.symbol == symbol) &
+            (candles.c.instrument_key == instrument_key) &
+            (candles.c.timeframe == timeframe)
+        )
+        if before_ts is not None:
+            # Untyped bind (a column comparison would coerce it to DateTime) so the driver formats before_ts
+            # the way the raw-text upsert stored ts; on SQLite the DateTime rendering sorts the boundary bar below itself
+            cond = cond & text("candles.ts < :before_ts").bindparams(bindparam('before_ts', before_ts, type_=NullType()))
+        return select(*columns).where(cond).order_by(candles.c.ts.desc()).limit(limit)
+
+    async def load_candles(self, symbol, instrument_key, timeframe, limit=200, before_ts=None):
         if not self._connected or not self.engine:
             return []
         
         try:
-            query = candles.select().where(
-                (candles.c.symbol == symbol) & 
-                (candles.c.instrument_key == instrument_key) &
-                (candles.c.timeframe == timeframe)
-            ).order_by(candles.c.ts.desc()).limit(limit)
+            query = self._latest_candles_query(candles.c, symbol, instrument_key, timeframe, limit, before_ts)
             
-            with self.engine.connect() as conn:
-                result = conn.execute(query)
-                rows = result.fetchall()
+            def _fetch():
+                with self._get_conn() as conn:
+                    return conn.execute(query).fetchall()
+            rows = await self._run_sync(_fetch)
             
             # Return in chronological order
             rows = list(reversed(rows))
@@ -157,124 +373,222 @@ class Database:
             logger.error(f"Failed to load candles: {e}")
             return []
 
-    async def persist_candle(self, symbol, instrument_key, timeframe, bar):
+    async def load_candles_columnar(self, symbol, instrument_key, timeframe, limit=200, before_ts=None) -> CandleColumns:
+        """Like load_candles, but returns column arrays instead of one dict per row."""
         if not self._connected or not self.engine:
-            return
-            
+            return CandleColumns.from_rows([])
+
         try:
-            with self.engine.connect() as conn:
-                # Simple upsert: insert if not exists, update if exists
-                from sqlalchemy import text
-                
-                upsert_sql = """
-                    INSERT INTO candles (symbol, instrument_key, timeframe, ts, open, high, low, close, volume)
-                    VALUES (:symbol, :instrument_key, :timeframe, :ts, :open, :high, :low, :close, :volume)
-                    ON CONFLICT (instrument_key, ts) DO UPDATE SET
-                        symbol = EXCLUDED.symbol,
-                        timeframe = EXCLUDED.timeframe,
-                        open = EXCLUDED.open,
-                        high = EXCLUDED.high,
-                        low = EXCLUDED.low,
-                        close = EXCLUDED.close,
-                        volume = EXCLUDED.volume
-                """
-                
-                conn.execute(text(upsert_sql), {
-                    'symbol': symbol,
-                    'instrument_key': instrument_key,
-                    'timeframe': timeframe,
-                    'ts': bar.ts,
-                    'open': bar.open,
-                    'high': bar.high,
-                    'low': bar.low,
-                    'close': bar.close,
-                    'volume': bar.volume
-                })
-                conn.commit()
+            columns = (candles.c.ts, candles.c.open, candles.c.high, candles.c.low, candles.c.close, candles.c.volume)
+            query = self._latest_candles_query(columns, symbol, instrument_key, timeframe, limit, before_ts)
+
+            def _fetch():
+                with self._get_conn() as conn:
+                    return conn.execute(query).fetchall()
+            rows = await self._run_sync(_fetch)
+            # Return in chronological order
+            return CandleColumns.from_rows(rows[::-1])
         except Exception as e:
-            logger.debug(f"Failed to persist candle: {e}")
+            logger.error(f"Failed to load candles: {e}")
+            return CandleColumns.from_rows([])
 
-    async def persist_candles_bulk(self, symbol, instrument_key, timeframe, bars):
+    async def persist_candle(self, symbol, instrument_key, timeframe, bar):
+        """Queue a bar for the write-behind buffer; it is persisted by the next flush."""
         if not self._connected or not self.engine:
             return
+        self._pending.append((symbol, instrument_key, timeframe, bar))
+        if len(self._pending) >= _CANDLE_FLUSH_MAX_PENDING and self._flush_wakeup:
+            self._flush_wakeup.set()
+
+    async def persist_candles_bulk(self, symbol, instrument_key, timeframe, bars):
+        if not self._connected or not self.engine or not bars:
+            return
             
+        def _write():
+            with self._get_conn() as conn:
+                rows = _candle_rows(symbol, instrument_key, timeframe, bars)
+                logger.debug(f"Persisting {len(rows)} candles for symbol: {symbol} and instrument_key: {instrument_key} and timeframe: {timeframe}")
+                # Single executemany round-trip instead of one execute per bar
+                conn.execute(_CANDLE_UPSERT, rows)
+                conn.execute(_SYMBOL_INSERT, {'symbol': symbol})
+
         try:
-            with self.engine.connect() as conn:
-                from sqlalchemy import text
-                
-                upsert_sql = """
-                    INSERT INTO candles (symbol, instrument_key, timeframe, ts, open, high, low, close, volume)
-                    VALUES (:symbol, :instrument_key, :timeframe, :ts, :open, :high, :low, :close, :volume)
-                    ON CONFLICT (instrument_key, ts) DO UPDATE SET
-                        symbol = EXCLUDED.symbol,
-                        timeframe = EXCLUDED.timeframe,
-                        open = EXCLUDED.open,
-                        high = EXCLUDED.high,
-                        low = EXCLUDED.low,
-                        close = EXCLUDED.close,
-                        volume = EXCLUDED.volume
-                """
-                
-                for b in bars:
-                    ts_val = b.get('ts') if isinstance(b, dict) else b.ts
-                    logger.debug(f"Persisting candle ts={ts_val} for symbol: {symbol} and instrument_key: {instrument_key} and timeframe: {timeframe}")
-                    conn.execute(text(upsert_sql), {
-                        'symbol': symbol,
-                        'instrument_key': instrument_key,
-                        'timeframe': timeframe,
-                        'ts': ts_val,
-                        'open': b.get('open') if isinstance(b, dict) else b.open,
-                        'high': b.get('high') if isinstance(b, dict) else b.high,
-                        'low': b.get('low') if isinstance(b, dict) else b.low,
-                        'close': b.get('close') if isinstance(b, dict) else b.close,
-                        'volume': b.get('volume') if isinstance(b, dict) else b.volume
-                    })
-                conn.commit()
+            await self._run_sync(_write)
         except Exception as e:
             logger.debug(f"Failed to persist candles bulk: {e}")
 
+    async def persist_candles_many(self, batches: List[Tuple]) -> None:
+        """Upsert candles for several series in one transaction.
+
+        batches: (symbol, instrument_key, timeframe, bars) tuples; empty bar lists are skipped.
+        """
+        batches = [b for b in batches if b[3]]
+        if not self._connected or not self.engine or not batches:
+            return
+
+        def _write():
+            with self._get_conn() as conn:
+                rows = []
+                for symbol, instrument_key, timeframe, bars in batches:
+                    rows.extend(_candle_rows(symbol, instrument_key, timeframe, bars))
+                logger.debug(f"Persisting {len(rows)} candles across {len(batches)} series")
+                conn.execute(_CANDLE_UPSERT, rows)
+                conn.execute(_SYMBOL_INSERT, [{'symbol': symbol} for symbol in {b[0] for b in batches}])
+
+        try:
+            await self._run_sync(_write)
+        except Exception as e:
+            logger.debug(f"Failed to persist candles batch: {e}")
+
+    async def persist_candles_copy(self, symbol, instrument_key, timeframe, bars):
+        """Bulk upsert through COPY into a staging table; for large backfills on Postgres/psycopg2.
+
+        Other drivers fall back to persist_candles_bulk.
+        """
+        if not self._connected or not self.engine or not bars:
+            return
+        if self.engine.dialect.driver != "psycopg2":
+            await self.persist_candles_bulk(symbol, instrument_key, timeframe, bars)
+            return
+
+        try:
+            logger.debug(f"Copying {len(bars)} candles for symbol: {symbol} and instrument_key: {instrument_key} and timeframe: {timeframe}")
+            await self._run_sync(lambda: self._copy_candles([(symbol, instrument_key, timeframe, bars)]))
+        except Exception as e:
+            logger.debug(f"Failed to copy candles bulk: {e}")
+
+    async def persist_candles_copy_many(self, batches: List[Tuple]) -> None:
+        """COPY variant of persist_candles_many: one COPY stream and one merge for all series.
+
+        Other drivers fall back to persist_candles_many.
+        """
+        batches = [b for b in batches if b[3]]
+        if not self._connected or not self.engine or not batches:
+            return
+        if self.engine.dialect.driver != "psycopg2":
+            await self.persist_candles_many(batches)
+            return
+
+        try:
+            logger.debug(f"Copying candles for {len(batches)} series")
+            await self._run_sync(lambda: self._copy_candles(batches))
+        except Exception as e:
+            logger.debug(f"Failed to copy candles batch: {e}")
+
+    def _copy_candles(self, batches: List[Tuple]) -> None:
+        """Blocking COPY + merge of (symbol, instrument_key, timeframe, bars) batches in one transaction."""
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for symbol, instrument_key, timeframe, bars in batches:
+            extract = _bar_items if isinstance(bars[0], dict) else _bar_attrs
+            for b in bars:
+                # None becomes an empty unquoted field, which COPY csv reads as NULL
+                writer.writerow((symbol, instrument_key, timeframe, *extract(b)))
+        buf.seek(0)
+
+        raw = self.engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            cur.execute(_CANDLE_STAGE_DDL)
+            cur.copy_expert(_CANDLE_STAGE_COPY, buf)
+            cur.execute(_CANDLE_STAGE_MERGE)
+            cur.executemany("INSERT INTO symbols (symbol) VALUES (%s) ON CONFLICT (symbol) DO NOTHING",
+                            [(symbol,) for symbol in {b[0] for b in batches}])
+            cur.close()
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
     async def upsert_ema_state(self, symbol, instrument_key, timeframe, period, value):
         if not self._connected or not self.engine:
             return
             
         try:
-            # Simple insert (replace if exists)
-            query = ema_state.insert().values(
-                symbol=symbol,
-                instrument_key=instrument_key,
-                timeframe=timeframe,
-                period=period,
-                ema_value=value,
-                last_ts=datetime.now()  # Use local timestamp instead of UTC
-            )
+            params = {
+                'symbol': symbol,
+                'instrument_key': instrument_key,
+                'timeframe': timeframe,
+                'period': period,
+                'ema_value': value,
+                'last_ts': datetime.now()  # Use local timestamp instead of UTC
+            }
             
-            with self.engine.connect() as conn:
-                conn.execute(query)
-                conn.commit()
+            def _write():
+                with self._get_conn() as conn:
+                    conn.execute(_EMA_STATE_UPSERT, params)
+            await self._run_sync(_write)
         except Exception as e:
             logger.debug(f"Failed to upsert EMA state: {e}")
 
+    async def upsert_ema_state_bulk(self, rows: List[dict]) -> bool:
+        """Upsert many EMA values in one round-trip; returns True when the write went through.
+
+        rows: dicts with symbol, instrument_key, timeframe, period, ema_value and optional last_ts.
+        """
+        if not self._connected or not self.engine or not rows:
+            return False
+
+        now = datetime.now()  # Use local timestamp instead of UTC
+        params = [{**r, 'last_ts': r.get('last_ts') or now} for r in rows]
+
+        def _write():
+            with self._get_conn() as conn:
+                conn.execute(_EMA_STATE_UPSERT, params)
+
+        try:
+            await self._run_sync(_write)
+            return True
+        except Exception as e:
+            logger.debug(f"Failed to upsert EMA state bulk: {e}")
+            return False
+
+    async def load_ema_states(self, symbol, instrument_key, timeframe, periods: List[int]) -> Dict[int, Tuple[float, datetime]]:
+        """Return {period: (ema_value, last_ts)} for the requested periods of one symbol/timeframe."""
+        if not self._connected or not self.engine or not periods:
+            return {}
+
+        try:
+            query = select(ema_state.c.period, ema_state.c.ema_value, ema_state.c.last_ts).where(
+                (ema_state.c.symbol == symbol) &
+                (ema_state.c.instrument_key == instrument_key) &
+                (ema_state.c.timeframe == timeframe) &
+                (ema_state.c.period.in_(list(periods)))
+            )
+
+            def _fetch():
+                with self._get_conn() as conn:
+                    return conn.execute(query).fetchall()
+            rows = await self._run_sync(_fetch)
+            return {r.period: (r.ema_value, r.last_ts) for r in rows}
+        except Exception as e:
+            logger.error(f"Failed to load EMA states: {e}")
+            return {}
+
     async def insert_trade(self, signal, resp):
         if not self._connected or not self.engine:
             return
             
         try:
-            order_id = resp.get("order_id") or resp.get("id") or str(datetime.utcnow().timestamp())
-            query = trades.insert().values(
-                id=order_id,
-                symbol=signal.symbol,
-                timeframe="1m",
-                side=signal.side,
-                entry_price=signal.price,
-                size=signal.size,
-                stop_loss=signal.stop_loss,
-                target=signal.target,
-                status="OPEN"
-            )
+            order_id = resp.get("order_id") or resp.get("id") or uuid7_str()
+            params = {
+                'id': order_id,
+                'symbol': signal.symbol,
+                'timeframe': "1m",
+                'side': signal.side,
+                'entry_price': signal.price,
+                'size': signal.size,
+                'stop_loss': signal.stop_loss,
+                'target': signal.target,
+                'status': "OPEN"
+            }
             
-            with self.engine.connect() as conn:
-                conn.execute(query)
-                conn.commit()
+            def _write():
+                with self._get_conn() as conn:
+                    conn.execute(_TRADE_INSERT, params)
+            await self._run_sync(_write)
         except Exception as e:
             logger.error(f"Failed to insert trade: {e}")
 
@@ -282,10 +596,11 @@ class Database:
         if not self._connected or not self.engine or trades is None:
             return
         try:
-            with self.engine.connect() as conn:
-                stmt = trades.update().where(trades.c.id == trade_id).values(status=status)
-                conn.execute(stmt)
-                conn.commit()
+            stmt = trades.update().where(trades.c.id == trade_id).values(status=status)
+            def _write():
+                with self._get_conn() as conn:
+                    conn.execute(stmt)
+            await self._run_sync(_write)
         except Exception as e:
             logger.error(f"Failed to update trade status: {e}")
 
@@ -293,32 +608,32 @@ class Database:
         if not self._connected or not self.engine or option_trades is None:
             return
         try:
-            import uuid
-            trade_id = str(uuid.uuid4())
-            reasoning_str = ";".join(opt_signal.reasoning) if getattr(opt_signal, 'reasoning', None) else ''
+            trade_id = uuid7_str()
+            reasoning = getattr(opt_signal, 'reasoning', None) or {}
             entry_id = getattr(opt_signal, 'entry_order_id', None)
             stop_id = getattr(opt_signal, 'stop_order_id', None)
             target_id = getattr(opt_signal, 'target_order_id', None)
             status_val = getattr(opt_signal, 'status', 'OPEN')
-            query = option_trades.insert().values(
-                id=trade_id,
-                contract_symbol=opt_signal.contract_symbol,
-                underlying_side=opt_signal.underlying_side,
-                strike=opt_signal.strike,
-                kind=opt_signal.kind,
-                premium_ltp=opt_signal.premium_ltp,
-                size_lots=opt_signal.suggested_size_lots,
-                stop_loss_premium=opt_signal.stop_loss_premium,
-                target_premium=opt_signal.target_premium,
-                reasoning=reasoning_str,
-                entry_order_id=entry_id,
-                stop_order_id=stop_id,
-                target_order_id=target_id,
-                status=status_val
-            )
-            with self.engine.connect() as conn:
-                conn.execute(query)
-                conn.commit()
+            params = {
+                'id': trade_id,
+                'contract_symbol': opt_signal.contract_symbol,
+                'underlying_side': opt_signal.underlying_side,
+                'strike': opt_signal.strike,
+                'kind': opt_signal.kind,
+                'premium_ltp': opt_signal.premium_ltp,
+                'size_lots': opt_signal.suggested_size_lots,
+                'stop_loss_premium': opt_signal.stop_loss_premium,
+                'target_premium': opt_signal.target_premium,
+                'reasoning': reasoning,
+                'entry_order_id': entry_id,
+                'stop_order_id': stop_id,
+                'target_order_id': target_id,
+                'status': status_val
+            }
+            def _write():
+                with self._get_conn() as conn:
+                    conn.execute(_OPTION_TRADE_INSERT, params)
+            await self._run_sync(_write)
         except Exception as e:
             logger.error(f"Failed to insert option trade: {e}")
 
@@ -326,10 +641,11 @@ class Database:
         if not self._connected or not self.engine or option_trades is None:
             return
         try:
-            with self.engine.connect() as conn:
-                stmt = option_trades.update().where(option_trades.c.contract_symbol == contract_symbol).values(status=status)
-                conn.execute(stmt)
-                conn.commit()
+            stmt = option_trades.update().where(option_trades.c.contract_symbol == contract_symbol).values(status=status)
+            def _write():
+                with self._get_conn() as conn:
+                    conn.execute(stmt)
+            await self._run_sync(_write)
         except Exception as e:
             logger.error(f"Failed to update option trade status: {e}")
 
@@ -339,13 +655,12 @@ class Database:
             return []
         
         try:
-            from sqlalchemy import select, extract
             query = select(trades).where(
                 extract('year', trades.c.created_at) == year,
                 extract('month', trades.c.created_at) == month
             )
             
-            with self.engine.connect() as conn:
+            with self._get_conn() as conn:
                 result = conn.execute(query)
                 rows = result.fetchall()
                 return [dict(row._mapping) for row in rows]
@@ -360,13 +675,12 @@ class Database:
             return []
         
         try:
-            from sqlalchemy import select, extract
             query = select(option_trades).where(
                 extract('year', option_trades.c.created_at) == year,
                 extract('month', option_trades.c.created_at) == month
             )
             
-            with self.engine.connect() as conn:
+            with self._get_conn() as conn:
                 result = conn.execute(query)
                 rows = result.fetchall()
                 return [dict(row._mapping) for row in rows]
@@ -381,10 +695,10 @@ class Database:
             return []
         
         try:
-            from sqlalchemy import select
-            query = select(candles.c.symbol).distinct()
-            result = await self.execute(query)
-            rows = result.fetchall()
+            def _fetch():
+                with self._get_conn() as conn:
+                    return conn.execute(select(symbols.c.symbol)).fetchall()
+            rows = await self._run_sync(_fetch)
             return [row[0] for row in rows]
         except Exception as e:
             logger.error(f"Failed to get symbols: {e}")
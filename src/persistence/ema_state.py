@@ -1,52 +1,92 @@
 """
 EMA State persistence utilities.
 """
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 from src.engine.ema import EMAState
 from src.persistence.db import Database
 
 
+# Changes smaller than this are not worth a write
+_EMA_EPSILON = 1e-9
+
+
 class EMAStatePersistence:
     """Handles persistence and restoration of EMA states."""
     
     def __init__(self, db: Database):
         self.db = db
+        # (symbol, instrument_key, timeframe, period) -> last value written
+        self._last_persisted: Dict[Tuple[str, str, str, int], float] = {}
+
+    @staticmethod
+    def _state_rows(ema_state: EMAState, symbol: str) -> List[dict]:
+        """Build ema_state rows for the short and long EMA of a state (skipping unset values).
+
+        Rows are keyed by the display symbol, matching load_ema_state; EMAState.symbol carries
+        the instrument key in the services.
+        """
+        rows = []
+        for period, value in ((ema_state.short_period, ema_state.short_ema),
+                              (ema_state.long_period, ema_state.long_ema)):
+            if value is not None:
+                rows.append({
+                    'symbol': symbol,
+                    'instrument_key': ema_state.symbol,
+                    'timeframe': ema_state.timeframe,
+                    'period': period,
+                    'ema_value': value
+                })
+        return rows
     
-    async def save_ema_state(self, ema_state: EMAState) -> None:
-        """Save EMA state to database."""
-        if ema_state.short_ema is not None:
-            await self.db.upsert_ema_state(
-                ema_state.symbol,
-                ema_state.timeframe,
-                ema_state.short_period,
-                ema_state.short_ema
-            )
-        
-        if ema_state.long_ema is not None:
-            await self.db.upsert_ema_state(
-                ema_state.symbol,
-                ema_state.timeframe,
-                ema_state.long_period,
-                ema_state.long_ema
-            )
+    async def _write_changed(self, rows: List[dict]) -> None:
+        """Upsert only rows whose value moved since the last successful write."""
+        changed = []
+        for r in rows:
+            key = (r['symbol'], r['instrument_key'], r['timeframe'], r['period'])
+            last = self._last_persisted.get(key)
+            if last is None or abs(r['ema_value'] - last) > _EMA_EPSILON:
+                changed.append((key, r))
+        if changed and await self.db.upsert_ema_state_bulk([r for _, r in changed]):
+            for key, r in changed:
+                self._last_persisted[key] = r['ema_value']
+
+    async def save_ema_state(self, ema_state: EMAState, symbol: str) -> None:
+        """Save EMA state to database under the display symbol."""
+        await self._write_changed(self._state_rows(ema_state, symbol))
     
     async def load_ema_state(
         self, 
         symbol: str, 
         timeframe: str, 
         short_period: int, 
-        long_period: int
+        long_period: int,
+        instrument_key: Optional[str] = None
     ) -> Optional[EMAState]:
-        """Load EMA state from database."""
-        try:
-            # This would need a proper query method in the Database class
-            # For now, return None and let the system reinitialize
-            return None
-        except Exception:
+        """Load EMA state from database.
+
+        Returns None unless both periods are stored, so callers fall back to a candle warmup.
+        """
+        instrument_key = instrument_key or symbol
+        stored = await self.db.load_ema_states(symbol, instrument_key, timeframe, [short_period, long_period])
+        if short_period not in stored or long_period not in stored:
             return None
+        # Values just read match the table, so an unchanged save can skip them
+        for period in (short_period, long_period):
+            self._last_persisted[(symbol, instrument_key, timeframe, period)] = stored[period][0]
+        return EMAState(
+            instrument_key,
+            timeframe,
+            short_period,
+            long_period,
+            short_ema=stored[short_period][0],
+            long_ema=stored[long_period][0]
+        )
     
-    async def save_all_states(self, states: Dict[str, EMAState]) -> None:
-        """Save all EMA states in bulk."""
-        for symbol, state in states.items():
-            await self.save_ema_state(state)
\ No newline at end of file
+    async def save_all_states(self, *state_maps: Dict[str, EMAState]) -> None:
+        """Save all EMA states (one or more symbol -> state maps) in a single bulk upsert."""
+        rows: List[dict] = []
+        for states in state_maps:
+            for symbol, state in states.items():
+                rows.extend(self._state_rows(state, symbol))
+        await self._write_changed(rows)
@@ -1,27 +1,334 @@
 import asyncio
+import bisect
+import functools
+import hashlib
+import importlib.util
+import json
 import logging
-import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, List
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
 
+import httpx
+import numpy as np
 import pandas as pd
-import upstox_client
 from dateutil import parser
 
+try:
+    import upstox_client
+except ImportError:
+    upstox_client = None
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON for candle responses and the disk cache
+    orjson = None
+
+from src.models.candle_models import CANDLE_DTYPE
 from src.utils.instruments import get_symbol_to_key_mapping
-from src.utils.orders_enum import Product, Validity
+from src.utils.orders_enum import (OrderType, Product, TransactionType,
+                                   Validity)
 from src.utils.time_utils import IST
 
 logger = logging.getLogger("broker_rest")
 
+_INTERVAL_MAP = MappingProxyType({
+    "1m": (1, "minutes"),
+    "5m": (5, "minutes"),
+    "15m": (15, "minutes"),
+    "30m": (30, "minutes"),
+    "1h": (1, "hours"),
+    "1d": (1, "days")
+})
+# Accept upper and lower case without a per-call .upper()
+_ORDER_TYPE_MAP = MappingProxyType({
+    **{t.value: t.value for t in (OrderType.MARKET, OrderType.LIMIT)},
+    **{t.value.lower(): t.value for t in (OrderType.MARKET, OrderType.LIMIT)}
+})
+_SIDE_MAP = MappingProxyType({
+    **{t.value: t.value for t in TransactionType},
+    **{t.value.lower(): t.value for t in TransactionType}
+})
+
+# Minute-level history longer than this is fetched as concurrent windows of this many days
+_HISTORY_WINDOW_DAYS = 30
+
+_UPSTOX_API_BASE = "https://api.upstox.com"
+# HTTP/2 needs the optional h2 package; fall back to pooled HTTP/1.1 without it
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Upper bound on concurrent blocking SDK calls per client; doubles as back-pressure for Upstox rate limits
+_REST_MAX_WORKERS = 16
+
+def _candles_to_frame(candles) -> pd.DataFrame:
+    """Convert raw Upstox candle rows [ts, open, high, low, close, volume, ...] column-wise into a typed frame."""
+    if not candles:
+        return pd.DataFrame({"ts": np.empty(0, dtype=object),
+                             **{c: np.empty(0, dtype=np.float64) for c in ("open", "high", "low", "close")},
+                             "volume": np.empty(0, dtype=np.int64)})
+    arr = np.array(candles, dtype=object)
+    if arr.ndim != 2:
+        # Ragged rows (e.g. some without volume): pad to a rectangle first
+        arr = np.array([list(c[:6]) + [0] * (6 - len(c)) for c in candles], dtype=object)
+    ohlc = arr[:, 1:5].astype(np.float64)
+    volume = arr[:, 5].astype(np.int64) if arr.shape[1] > 5 else np.zeros(len(arr), dtype=np.int64)
+    return pd.DataFrame({
+        "ts": arr[:, 0],
+        "open": ohlc[:, 0],
+        "high": ohlc[:, 1],
+        "low": ohlc[:, 2],
+        "close": ohlc[:, 3],
+        "volume": volume,
+    })
+
+
+def _candle_to_dict(c, _float=float, _int=int) -> Dict[str, Any]:
+    """One raw Upstox candle row as a record; used where no frame is needed."""
+    return {"ts": c[0], "open": _float(c[1]), "high": _float(c[2]), "low": _float(c[3]),
+            "close": _float(c[4]), "volume": _int(c[5]) if len(c) > 5 else 0}
+
+
+def _json_loads(raw: bytes) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj) if orjson is not None else json.dumps(obj).encode()
+
+
+def _read_cached_candles(path: str) -> Optional[list]:
+    try:
+        with open(path, 'rb') as f:
+            return _json_loads(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable candle cache %s: %s", path, e)
+        return None
+
+
+def _write_cached_candles(path: str, candles: list) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(_json_dumps(list(candles)))
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning("Failed to write candle cache %s: %s", path, e)
+
+
+def _date_windows(from_date_str: str, to_date_str: str, max_days: int = _HISTORY_WINDOW_DAYS) -> List[Tuple[str, str]]:
+    """Split an inclusive YYYY-MM-DD range into consecutive non-overlapping windows of at most max_days."""
+    start = datetime.strptime(from_date_str, "%Y-%m-%d").date()
+    end = datetime.strptime(to_date_str, "%Y-%m-%d").date()
+    windows = []
+    while start <= end:
+        stop = min(start + timedelta(days=max_days - 1), end)
+        windows.append((start.strftime("%Y-%m-%d"), stop.strftime("%Y-%m-%d")))
+        start = stop + timedelta(days=1)
+    return windows or [(from_date_str, to_date_str)]
+
+
+_GREEK_COLUMNS = ("delta", "gamma", "theta", "vega")
+# Shared option kind strings: every chain row references the same two objects
+_CALL = sys.intern("CALL")
+_PUT = sys.intern("PUT")
+
+
+def _option_chain_frame(items, expiry_date: str) -> pd.DataFrame:
+    """Fill preallocated typed columns from the put/call chain response (one CALL and one PUT row per strike)."""
+    cap = 2 * len(items)
+    symbols = np.empty(cap, dtype=object)
+    kinds = np.empty(cap, dtype=object)
+    expiries = np.empty(cap, dtype=object)
+    strikes = np.empty(cap, dtype=np.float64)
+    oi = np.empty(cap, dtype=np.int64)
+    floats = {c: np.empty(cap, dtype=np.float64) for c in ("iv", "ltp", "bid", "ask") + _GREEK_COLUMNS}
+    nan = float("nan")
+    # Flyweight: one formatted string per distinct expiry instead of one strftime per strike
+    expiry_strs: Dict[Any, str] = {}
+    i = 0
+    for item in items:
+        if item.expiry:
+            expiry = expiry_strs.get(item.expiry)
+            if expiry is None:
+                expiry = expiry_strs[item.expiry] = item.expiry.strftime('%Y-%m-%d')
+        else:
+            expiry = expiry_date
+        for opt, kind in ((item.call_options, _CALL), (item.put_options, _PUT)):
+            if not opt or not opt.market_data:
+                continue
+            md = opt.market_data
+            greeks = opt.option_greeks
+            symbols[i] = opt.instrument_key
+            kinds[i] = kind
+            expiries[i] = expiry
+            strikes[i] = item.strike_price
+            oi[i] = md.oi or 0
+            floats["iv"][i] = greeks.iv or 0.0
+            floats["ltp"][i] = md.ltp or 0.0
+            floats["bid"][i] = md.bid_price or 0.0
+            floats["ask"][i] = md.ask_price or 0.0
+            for g in _GREEK_COLUMNS:
+                value = getattr(greeks, g)
+                floats[g][i] = nan if value is None else value
+            i += 1
+    return pd.DataFrame({
+        "symbol": symbols[:i],
+        "strike": strikes[:i],
+        "type": kinds[:i],
+        "expiry": expiries[:i],
+        "oi": oi[:i],
+        **{c: arr[:i] for c, arr in floats.items()},
+    })
+
+
+def _chain_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """List-of-dicts view of a chain frame; missing greeks come back as None rather than NaN."""
+    records = df.to_dict("records")
+    if df[list(_GREEK_COLUMNS)].isna().values.any():
+        for r in records:
+            for g in _GREEK_COLUMNS:
+                if r[g] != r[g]:
+                    r[g] = None
+    return records
+
+
+def _parse_expiry(expiry: Any) -> Optional[date]:
+    """Expiry as a date; Upstox sends ISO strings so strptime is tried before dateutil."""
+    if isinstance(expiry, datetime):
+        return expiry.date()
+    if isinstance(expiry, date):
+        return expiry
+    if isinstance(expiry, str):
+        try:
+            return datetime.strptime(expiry, "%Y-%m-%d").date()
+        except ValueError:
+            return parser.parse(expiry).date()
+    logger.warning("Invalid expiry format: %s", expiry)
+    return None
+
+
+def _synthetic_chain(instrument_key: str, spot: float, expiry: str, width: int = 1) -> List[Dict[str, Any]]:
+    """Placeholder chain of ATM +/- width strikes (50 apart), CALL then PUT per strike, built column-wise."""
+    if spot <= 0:
+        return []
+    # Determine ATM strike rounding to nearest 50
+    atm = int(round(spot / 50.0) * 50)
+    if atm <= 0:
+        return []
+    offsets = np.arange(-width, width + 1, dtype=np.int64) * 50
+    strikes = np.repeat(atm + offsets, 2)
+    diff = np.repeat(offsets, 2)
+    is_call = np.tile([True, False], len(offsets))
+    # Placeholder values (would come from market data api)
+    ltp = np.maximum(1.0, np.abs(diff) * 0.4 + np.where(is_call, 10.0, 9.0))
+    oi = np.where(is_call, 100000 + diff * 200, 95000 - diff * 180)
+    iv = np.maximum(12.0 + diff / 1000.0, 5.0)
+    key = instrument_key.upper()
+    return [
+        {
+            # Synthetic symbol pattern (needs real mapping): e.g. NIFTY24OCT{strike}{CE/PE}
+            'symbol': f"{key}_OPT_{strike}{'CE' if call else 'PE'}",
+            'strike': strike,
+            'type': _CALL if call else _PUT,
+            'expiry': expiry,
+            'oi': max(o, 1000),
+            'iv': v,
+            'ltp': p,
+            'bid': p - 0.5,
+            'ask': p + 0.5,
+        }
+        for strike, call, o, v, p in zip(strikes.tolist(), is_call.tolist(), oi.astype(np.int64).tolist(), iv.tolist(), ltp.tolist())
+    ]
+
+
+# Bars per NSE session (9:15-15:30 => 375 minutes) for the common timeframes
+_BARS_PER_DAY = MappingProxyType({"1m": 375, "3m": 125, "5m": 75, "15m": 25, "30m": 12, "1h": 6, "1d": 1})
+
+
+def _parse_bars_per_day(tf: str) -> int:
+    """bars_per_day for timeframes outside _BARS_PER_DAY (e.g. '10m', '2h')."""
+    if tf.endswith("m"):
+        try:
+            return max(1, 375 // int(tf[:-1]))
+        except ValueError:
+            return 375
+    if tf.endswith("h"):
+        try:
+            return max(1, int(6.25 // int(tf[:-1])))  # 6h15m session
+        except ValueError:
+            return 6
+    return 1
+
+
+@functools.lru_cache(maxsize=64)
+def _date_range_for(timeframe: str, limit: int, today_iso: str) -> tuple:
+    """Calculate from_date and to_date based on timeframe & desired candles.
+
+    We approximate number of bars per trading day on NSE:
+      - Trading session ~ 9:15 to 15:30 => 6h15m => 375 minutes.
+      - For minute intervals: bars_per_day = floor(375 / interval_minutes).
+      - For hour intervals: bars_per_day = floor(6.25 / interval_hours).
+      - For daily timeframe: 1 bar per day.
+
+    If limit exceeds bars_per_day, we extend from_date backwards enough days.
+    Always set to_date to yesterday to avoid partial current day data.
+    Cached per (timeframe, limit, today_iso); a new day is a new key.
+    """
+    to_date = date.fromisoformat(today_iso) - timedelta(days=1)
+
+    # Determine bars per day for given timeframe
+    tf = timeframe.lower()
+    bars_per_day = _BARS_PER_DAY.get(tf)
+    if bars_per_day is None:
+        bars_per_day = _parse_bars_per_day(tf)
+    days_needed = max(1, -(-limit // bars_per_day))
+    from_date = to_date - timedelta(days=days_needed)
+
+    to_date_str = to_date.strftime("%Y-%m-%d")
+    from_date_str = from_date.strftime("%Y-%m-%d")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Date range calc timeframe=%s limit=%d bars_per_day=%d days_needed=%d from=%s to=%s",
+            timeframe, limit, bars_per_day, days_needed, from_date_str, to_date_str
+        )
+    return from_date_str, to_date_str
+
+
+# One ApiClient (and urllib3 pool) per token, shared by every BrokerRest instance
+_API_CLIENT_CACHE: Dict[str, Any] = {}
+_API_POOL_MAXSIZE = 32
+_PING_TTL_SEC = 30.0
+# Completed (past) historical windows never change, so they are kept on disk across runs
+_CANDLE_CACHE_DIR = os.path.join(os.path.dirname(__file__), '../data/candle_cache')
+
+
 class BrokerRest:
-    def __init__(self, api_key: str, api_secret: str, access_token: str = None):
+    def __init__(self, api_key: str, api_secret: str, access_token: str = None,
+                 cache_dir: Optional[str] = _CANDLE_CACHE_DIR):
         self.api_key = api_key
         self.api_secret = api_secret
         self.access_token = access_token
+        self._executor = ThreadPoolExecutor(max_workers=_REST_MAX_WORKERS, thread_name_prefix="upstox-rest")
+        # Async HTTP client for read-only market data; created lazily inside the running loop
+        self._http: Optional[httpx.AsyncClient] = None
+        self._http_enabled = bool(access_token)
+        self._last_ping_ts = float("-inf")
+        self._cache_dir = cache_dir
+        # Expiries/contracts change at most daily: keyed by (instrument_key, IST date) so a new day misses
+        self._contracts_cache: Dict[Tuple[str, date], list] = {}
+        self._expiry_cache: Dict[Tuple[str, date], str] = {}
         
         # Load symbol mapping from instruments configuration
         try:
+            # Shared read-only map (loaded once per process, keys/values interned)
             self.symbol_map = get_symbol_to_key_mapping()
             logger.info(f"Loaded {len(self.symbol_map)} instrument mappings for broker_rest")
         except Exception as e:
@@ -30,11 +337,17 @@ class BrokerRest:
             
         # Initialize Upstox configuration
         try:
-            self.configuration = upstox_client.Configuration()
-            self.configuration.access_token = access_token or api_key
-            
+            token = access_token or api_key
+            api_client = _API_CLIENT_CACHE.get(token)
+            if api_client is None:
+                configuration = upstox_client.Configuration()
+                configuration.access_token = token
+                # urllib3 pool sized for the executor so concurrent calls don't reconnect
+                configuration.connection_pool_maxsize = _API_POOL_MAXSIZE
+                api_client = _API_CLIENT_CACHE[token] = upstox_client.ApiClient(configuration)
+            self.configuration = api_client.configuration
+
             # Initialize API clients
-            api_client = upstox_client.ApiClient(self.configuration)
             self.login_api = upstox_client.LoginApi(api_client)
             self.order_api = upstox_client.OrderApi(api_client)
             self.historical_api = upstox_client.HistoryV3Api(api_client)
@@ -48,67 +361,153 @@ class BrokerRest:
             self.order_api = None
             self.historical_api = None
 
+    async def _call(self, fn, *args):
+        """Run a blocking SDK call on this client's executor."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _get_http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=_UPSTOX_API_BASE,
+                http2=_HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=_REST_MAX_WORKERS * 2, max_keepalive_connections=16),
+                timeout=30.0,
+                headers={"Authorization": f"Bearer {self.access_token}", "Accept": "application/json"},
+            )
+        return self._http
+
+    def _candle_cache_path(self, symbol: str, unit: str, interval: int, to_date_str: str, from_date_str: str) -> Optional[str]:
+        """Disk cache file for a window that ended before today (IST); None if it may still change."""
+        if not self._cache_dir or to_date_str >= datetime.now(IST).strftime("%Y-%m-%d"):
+            return None
+        key = hashlib.blake2b(f"{symbol}|{unit}|{interval}|{from_date_str}|{to_date_str}".encode(),
+                              digest_size=16).hexdigest()
+        return os.path.join(self._cache_dir, f"{key}.json")
+
+    async def _historical_candles(self, symbol: str, unit: str, interval: int, to_date_str: str, from_date_str: str) -> list:
+        """Raw candle rows for a date range, served from the disk cache for completed past windows."""
+        path = self._candle_cache_path(symbol, unit, interval, to_date_str, from_date_str)
+        if path:
+            cached = await self._call(_read_cached_candles, path)
+            if cached is not None:
+                return cached
+        candles = await self._fetch_historical_candles(symbol, unit, interval, to_date_str, from_date_str)
+        if path and candles:
+            await self._call(_write_cached_candles, path, candles)
+        return candles
+
+    async def _fetch_historical_candles(self, symbol: str, unit: str, interval: int, to_date_str: str, from_date_str: str) -> list:
+        """Raw candle rows for a date range: direct async HTTP when we hold a token, else the SDK on the executor."""
+        if self._http_enabled:
+            return await self._get_candles(
+                f"/v3/historical-candle/{quote(symbol, safe='')}/{unit}/{interval}/{to_date_str}/{from_date_str}")
+        response = await self._call(
+            self.historical_api.get_historical_candle_data1, symbol, unit, interval, to_date_str, from_date_str
+        )
+        return response.data.candles if response.data and response.data.candles else []
+
+    async def _intraday_candles(self, symbol: str, unit: str, interval: int) -> list:
+        """Raw candle rows for the current session: direct async HTTP when we hold a token, else the SDK."""
+        if self._http_enabled:
+            return await self._get_candles(f"/v3/historical-candle/intraday/{quote(symbol, safe='')}/{unit}/{interval}")
+        response = await self._call(self.historical_api.get_intra_day_candle_data, symbol, unit, interval)
+        return response.data.candles if response.data and response.data.candles else []
+
+    async def _get_candles(self, path: str) -> list:
+        response = await self._get_http().get(path)
+        response.raise_for_status()
+        data = _json_loads(response.content).get("data") or {}
+        return data.get("candles") or []
+
     async def ping(self) -> bool:
         """Test connection to Upstox API."""
         if upstox_client is None:
             logger.warning("Upstox SDK not available")
             return False
-            
+
+        # A recent successful profile call is good enough for liveness probes
+        now = time.monotonic()
+        if now - self._last_ping_ts < _PING_TTL_SEC:
+            return True
         try:
             # Run in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                lambda: self.login_api.get_profile()
-            )
+            response = await self._call(self.login_api.get_profile)
             logger.info(f"Upstox connection successful: {response.data.user_name}")
+            self._last_ping_ts = now
             return True
         except Exception as e:
             logger.error(f"Connection failed: {e}")
             return False
 
+    async def _fetch_historical_frame(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+        """Historical candles as a typed frame in API row order; errors propagate to the public wrappers."""
+        # Convert interval format (1m -> interval=1, unit=minute)
+        interval, unit = self._convert_interval(timeframe)
+        
+        # Calculate date range for historical data
+        from_date_str, to_date_str = self._calculate_date_range(timeframe, limit)
+        
+        logger.info(f"Fetching historical data for {symbol} from {from_date_str} to {to_date_str}")
+        
+        windows = _date_windows(from_date_str, to_date_str) if unit == "minutes" else [(from_date_str, to_date_str)]
+        results = await asyncio.gather(*(
+            self._historical_candles(symbol, unit, interval, to_s, from_s)
+            for from_s, to_s in windows
+        ))
+        frames = [_candles_to_frame(candles) for candles in results if candles]
+        
+        if not frames:
+            frame = _candles_to_frame([])
+        elif len(frames) == 1:
+            frame = frames[0]
+        else:
+            # Keep the API's row order (it may be newest-first) across the merged windows
+            sample = next((f for f in frames if len(f) > 1), frames[0])
+            ascending = len(sample) < 2 or sample["ts"].iloc[0] <= sample["ts"].iloc[-1]
+            frame = pd.concat(frames, ignore_index=True).sort_values("ts", ascending=ascending, kind="stable")
+        
+        logger.info(f"Fetched {len(frame)} historical candles for {symbol} in {len(windows)} request(s)")
+        return frame
+
     async def fetch_historical(self, symbol: str, timeframe: str = "1m", limit: int = 375) -> List[Dict]:
         """Fetch historical candle data from Upstox."""           
         try:
-            # Convert interval format (1m -> interval=1, unit=minute)
-            interval, unit = self._convert_interval(timeframe)
-            
-            # Calculate date range for historical data
-            from_date_str, to_date_str = self._calculate_date_range(timeframe, limit)
-            
-            logger.info(f"Fetching historical data for {symbol} from {from_date_str} to {to_date_str}")
-            
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.historical_api.get_historical_candle_data1(
-                    symbol,
-                    unit,
-                    interval,
-                    to_date=to_date_str,
-                    from_date=from_date_str
-                )
-            )
-            
-            candles = []
-            if response.data and response.data.candles:
-                # for candle in response.data.candles[-limit:] # Get last 'limit' candles
-                for candle in response.data.candles:  # Get last 'limit' candles
-                    candles.append({
-                        "ts": candle[0],  # timestamp
-                        "open": float(candle[1]),
-                        "high": float(candle[2]),
-                        "low": float(candle[3]),
-                        "close": float(candle[4]),
-                        "volume": int(candle[5]) if len(candle) > 5 else 0
-                    })
-            
-            logger.info(f"Fetched {len(candles)} historical candles for {symbol}")
-            return candles
+            frame = await self._fetch_historical_frame(symbol, timeframe, limit)
+            return frame.to_dict("records")
         except Exception as e:
             logger.error(f"Error fetching historical data for {symbol}: {e}")
             return []
 
+    async def fetch_historical_array(self, symbol: str, timeframe: str = "1m", limit: int = 375) -> np.ndarray:
+        """Like fetch_historical, but returns a CANDLE_DTYPE structured array (no per-row dicts)."""
+        try:
+            frame = await self._fetch_historical_frame(symbol, timeframe, limit)
+        except Exception as e:
+            logger.error(f"Error fetching historical data for {symbol}: {e}")
+            frame = _candles_to_frame([])
+        out = np.empty(len(frame), dtype=CANDLE_DTYPE)
+        for name in CANDLE_DTYPE.names:
+            out[name] = frame[name].to_numpy()
+        return out
+
+    async def fetch_historical_batch(self, symbols: List[str], timeframe: str = "1m", limit: int = 375,
+                                     concurrency: int = 8) -> Dict[str, List[Dict]]:
+        """Fetch historical candles for many instrument keys concurrently (at most `concurrency` in flight)."""
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(sym):
+            async with sem:
+                return await self.fetch_historical(sym, timeframe, limit)
+
+        results = await asyncio.gather(*(one(s) for s in symbols), return_exceptions=True)
+        out: Dict[str, List[Dict]] = {}
+        for sym, res in zip(symbols, results):
+            if isinstance(res, Exception):
+                logger.error(f"Error fetching historical data for {sym}: {res}")
+                res = []
+            out[sym] = res
+        return out
+
     async def fetch_historical_date_range(self, symbol: str, timeframe: str, from_date: datetime, to_date: datetime) -> List[Dict]:
         """Fetch historical candle data for a specific date range."""
         try:
@@ -121,29 +520,8 @@ class BrokerRest:
 
             logger.info(f"Fetching historical data for {symbol} from {from_date_str} to {to_date_str}")
 
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.historical_api.get_historical_candle_data1(
-                    symbol,
-                    unit,
-                    interval,
-                    to_date=to_date_str,
-                    from_date=from_date_str
-                )
-            )
-
-            candles = []
-            if response.data and response.data.candles:
-                for candle in response.data.candles:
-                    candles.append({
-                        "ts": candle[0],  # timestamp
-                        "open": float(candle[1]),
-                        "high": float(candle[2]),
-                        "low": float(candle[3]),
-                        "close": float(candle[4]),
-                        "volume": int(candle[5]) if len(candle) > 5 else 0
-                    })
+            raw = await self._historical_candles(symbol, unit, interval, to_date_str, from_date_str)
+            candles = list(map(_candle_to_dict, raw))
 
             logger.info(f"Fetched {len(candles)} historical candles for {symbol} ({from_date_str} to {to_date_str})")
             return candles
@@ -155,29 +533,7 @@ class BrokerRest:
         """Fetch current day's intraday candles (from today's open until now)."""
         try:
             interval, unit = self._convert_interval(timeframe)
-            from datetime import datetime
-            today = datetime.now().strftime("%Y-%m-%d")
-            # Use today for both from/to to get partial day; API should return up to current time.
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.historical_api.get_intra_day_candle_data(
-                    symbol,
-                    unit,
-                    interval
-                )
-            )
-            candles = []
-            if response.data and response.data.candles:
-                for candle in response.data.candles:
-                    candles.append({
-                        "ts": candle[0],
-                        "open": float(candle[1]),
-                        "high": float(candle[2]),
-                        "low": float(candle[3]),
-                        "close": float(candle[4]),
-                        "volume": int(candle[5]) if len(candle) > 5 else 0
-                    })
+            candles = list(map(_candle_to_dict, await self._intraday_candles(symbol, unit, interval)))
             logger.info(f"Fetched {len(candles)} intraday candles for {symbol}")
             return candles
         except Exception as e:
@@ -192,25 +548,26 @@ class BrokerRest:
             
         try:
             # Convert order data to Upstox format
+            get = payload.get
+            symbol = get("symbol")
+            side = get("side", "BUY")
+            quantity = get("quantity", 1)
+            instrument_token = self.symbol_map.get(symbol) or f"NSE_EQ|{symbol}"
             body = upstox_client.PlaceOrderRequest(
-                quantity=payload.get("quantity", 1),
+                quantity=quantity,
                 product=Product.I,  # Intraday
                 validity=Validity.DAY,
-                price=payload.get("price", 0.0),
+                price=get("price", 0.0),
                 tag="mental-trader",
-                instrument_token=self._get_instrument_token(payload.get("symbol")),
-                order_type=self._convert_order_type(payload.get("type", "MARKET")),
-                transaction_type=self._convert_side(payload.get("side", "BUY")),
+                instrument_token=instrument_token,
+                order_type=self._convert_order_type(get("type", "MARKET")),
+                transaction_type=self._convert_side(side),
                 disclosed_quantity=0,
-                trigger_price=payload.get("trigger_price", 0.0),
+                trigger_price=get("trigger_price", 0.0),
                 is_amo=False
             )
             
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.order_api.place_order(body)
-            )
+            response = await self._call(self.order_api.place_order, body)
             
             if response.data:
                 order_id = response.data.order_id
@@ -218,9 +575,9 @@ class BrokerRest:
                 return {
                     "order_id": order_id,
                     "status": "placed",
-                    "symbol": payload.get("symbol"),
-                    "side": payload.get("side"),
-                    "quantity": payload.get("quantity")
+                    "symbol": symbol,
+                    "side": side,
+                    "quantity": quantity
                 }
             else:
                 logger.error("No order data in response")
@@ -232,185 +589,122 @@ class BrokerRest:
 
     async def close(self):
         """Close any resources."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._executor.shutdown(wait=False)
 
     # ---------------- Option / Derivatives Helpers -----------------
-    def get_underlying_price(self, underlying_symbol: str) -> Dict[str, Any]:
+    async def get_underlying_price(self, underlying_symbol: str) -> Dict[str, Any]:
         """Fetch underlying price using Upstox HistoricalApi."""
         try:
             fut_symbol = self._derive_futures_symbol(underlying_symbol)
-            data = self.historical_api.get_intra_day_candle_data(fut_symbol, "minutes", 1)
+            candles = await self._intraday_candles(fut_symbol, "minutes", 1)
             
             # Fallback to historical single candle if intraday empty
-            if (not data) or (not getattr(data, 'data', None)) or (not data.data.candles):
-                from_to_date = pd.Timestamp.now(tz=IST) - timedelta(days=1)
-                to_date_str = from_to_date.strftime("%Y-%m-%d")
-                from_date_str = from_to_date.strftime("%Y-%m-%d")
-
-                data = self.historical_api.get_historical_candle_data1(
-                        fut_symbol,
-                        "minutes",
-                        1,
-                        to_date=to_date_str,
-                        from_date=from_date_str
-                    )
+            if not candles:
+                # Previous IST day; from/to are the same single date
+                to_date_str = from_date_str = (datetime.now(IST) - timedelta(days=1)).strftime("%Y-%m-%d")
+                candles = await self._historical_candles(fut_symbol, "minutes", 1, to_date_str, from_date_str)
             last_price = 0.0
-            if data and getattr(data, 'data', None) and data.data.candles:
-                last_candle = data.data.candles[-1]
+            if candles:
+                last_candle = candles[-1]
                 last_price = float(last_candle[4])
             return {"last_price": last_price, "instrument": fut_symbol, "source": "historical_api"}
         except Exception as e:
             logger.warning("get_underlying_price failed: %s", e)
             return {"last_price": 0.0, "status": "ERROR"}
 
+    def _raw_option_contracts(self, instrument_key: str) -> list:
+        """Raw option contracts from the SDK, fetched once per instrument per trading day."""
+        key = (instrument_key, datetime.now(IST).date())
+        contracts = self._contracts_cache.get(key)
+        if contracts is None:
+            contracts = self.options_api.get_option_contracts(instrument_key).data or []
+            if contracts:
+                self._contracts_cache = {k: v for k, v in self._contracts_cache.items() if k[1] == key[1]}
+                self._contracts_cache[key] = contracts
+        return contracts
+
     def find_nearest_expiry(self, instrument_key: str) -> str:
         """Find the nearest expiry date for the given underlying instrument key."""
+        cache_key = (instrument_key, datetime.now(IST).date())
+        cached = self._expiry_cache.get(cache_key)
+        if cached:
+            return cached
         try:
             # Fetch option contracts
-            response = self.options_api.get_option_contracts(instrument_key)
-            contracts = response.data
+            contracts = self._raw_option_contracts(instrument_key)
 
             if not contracts:
                 logger.warning("No option contracts found for %s", instrument_key)
                 return None
 
             # Extract unique expiry dates
-            expiry_dates = set()
-            for contract in contracts:
-                if hasattr(contract, 'expiry') and contract.expiry:
-                    expiry_dates.add(contract.expiry)
+            expiry_dates = {c.expiry for c in contracts if getattr(c, 'expiry', None)}
 
             if not expiry_dates:
                 logger.warning("No expiry dates found in contracts for %s", instrument_key)
                 return None
 
-            # Parse current date and expiry dates
-            current_date = datetime.now().date()
-            parsed_expiries = []
-            for expiry in expiry_dates:
-                if isinstance(expiry, str):
-                    parsed_expiries.append(parser.parse(expiry).date())
-                elif isinstance(expiry, (datetime, date)):
-                    parsed_expiries.append(expiry.date() if isinstance(expiry, datetime) else expiry)
-                else:
-                    logger.warning("Invalid expiry format: %s", expiry)
-                    continue
-
-            # Filter future expiries and find the nearest
-            future_expiries = [exp for exp in parsed_expiries if exp >= current_date]
-            if not future_expiries:
+            # Parse each distinct expiry once and bisect for the nearest future one
+            current_date = cache_key[1]
+            parsed_expiries = sorted({d for d in map(_parse_expiry, expiry_dates) if d is not None})
+            idx = bisect.bisect_left(parsed_expiries, current_date)
+            if idx == len(parsed_expiries):
                 logger.warning("No future expiry dates found for %s", instrument_key)
                 return None
-
-            # Find the nearest expiry
-            nearest_expiry = min(future_expiries, key=lambda x: (x - current_date).days)
-            return nearest_expiry.strftime('%Y-%m-%d')
+            nearest_expiry = parsed_expiries[idx]
+            result = nearest_expiry.strftime('%Y-%m-%d')
+            self._expiry_cache = {k: v for k, v in self._expiry_cache.items() if k[1] == cache_key[1]}
+            self._expiry_cache[cache_key] = result
+            return result
         except Exception as e:
             logger.error("Unexpected error: %s", e)
             return None
 
-    def get_option_chain(self, instrument_key: str) -> List[Dict[str, Any]]:
+    def _fetch_option_chain_frame(self, instrument_key: str, expiry_date: str) -> pd.DataFrame:
+        response = self.options_api.get_put_call_option_chain(instrument_key, expiry_date)
+        return _option_chain_frame(response.data or [], expiry_date)
+
+    def get_option_chain_df(self, instrument_key: str) -> pd.DataFrame:
+        """Nearest-expiry option chain as a typed DataFrame (same columns as get_option_chain rows).
+
+        Empty when no expiry is found; API errors propagate (get_option_chain adds the synthetic fallback).
+        """
+        expiry_date = self.find_nearest_expiry(instrument_key)
+        if not expiry_date:
+            return _option_chain_frame([], None)
+        return self._fetch_option_chain_frame(instrument_key, expiry_date)
+
+    async def get_option_chain(self, instrument_key: str) -> List[Dict[str, Any]]:
         """Fetch option chain for the given underlying instrument key."""
         if upstox_client is None:
             return []
         try:
-            # Find nearest expiry
-            expiry_date = self.find_nearest_expiry(instrument_key)
+            # Find nearest expiry (may fetch contracts on a cold cache)
+            expiry_date = await self._call(self.find_nearest_expiry, instrument_key)
             if not expiry_date:
                 logger.warning("No expiry found for %s", instrument_key)
                 return []
             
-            # Fetch option chain for nearest expiry
-            response = self.options_api.get_put_call_option_chain(instrument_key, expiry_date)
-            
-            chain = []
-            if response.data:
-                for item in response.data:
-                    # Extract call option
-                    if item.call_options and item.call_options.market_data:
-                        call_md = item.call_options.market_data
-                        call_greeks = item.call_options.option_greeks
-                        chain.append({
-                            'symbol': item.call_options.instrument_key,
-                            'strike': item.strike_price,
-                            'type': 'CALL',
-                            'expiry': item.expiry.strftime('%Y-%m-%d') if item.expiry else expiry_date,
-                            'oi': call_md.oi or 0,
-                            'iv': call_greeks.iv or 0.0,
-                            'ltp': call_md.ltp or 0.0,
-                            'bid': call_md.bid_price or 0.0,
-                            'ask': call_md.ask_price or 0.0,
-                            'delta': call_greeks.delta,
-                            'gamma': call_greeks.gamma,
-                            'theta': call_greeks.theta,
-                            'vega': call_greeks.vega
-                        })
-                    
-                    # Extract put option
-                    if item.put_options and item.put_options.market_data:
-                        put_md = item.put_options.market_data
-                        put_greeks = item.put_options.option_greeks
-                        chain.append({
-                            'symbol': item.put_options.instrument_key,
-                            'strike': item.strike_price,
-                            'type': 'PUT',
-                            'expiry': item.expiry.strftime('%Y-%m-%d') if item.expiry else expiry_date,
-                            'oi': put_md.oi or 0,
-                            'iv': put_greeks.iv or 0.0,
-                            'ltp': put_md.ltp or 0.0,
-                            'bid': put_md.bid_price or 0.0,
-                            'ask': put_md.ask_price or 0.0,
-                            'delta': put_greeks.delta,
-                            'gamma': put_greeks.gamma,
-                            'theta': put_greeks.theta,
-                            'vega': put_greeks.vega
-                        })
-            
+            chain = _chain_records(await self._call(self._fetch_option_chain_frame, instrument_key, expiry_date))
             logger.info(f"Fetched {len(chain)} options from Upstox API for {instrument_key}")
             return chain
         except Exception as e:
             logger.warning("Upstox option chain API failed: %s, falling back to synthetic", e)
             # Fallback to synthetic chain if API fails
-            spot_info = self.get_underlying_price(instrument_key)
-            spot = spot_info.get('last_price', 0.0)
-            if spot <= 0:
-                spot = 0.0
-            # Determine ATM strike rounding to nearest 50
-            atm = int(round(spot / 50.0) * 50) if spot > 0 else 0
-            strikes = [atm - 50, atm, atm + 50] if atm > 0 else []
-            chain: List[Dict[str, Any]] = []
-            for strike in strikes:
-                for opt_type in ("CALL", "PUT"):
-                    # Synthetic symbol pattern (needs real mapping): e.g. NIFTY24OCT{strike}{CE/PE}
-                    suffix = "CE" if opt_type == "CALL" else "PE"
-                    symbol = f"{instrument_key.upper()}_OPT_{strike}{suffix}"
-                    # Placeholder values (would come from market data api)
-                    ltp = max(1.0, abs(atm - strike) * 0.4 + (10 if opt_type == 'CALL' else 9))
-                    bid = ltp - 0.5
-                    ask = ltp + 0.5
-                    oi = 100000 + (strike - atm) * 200 if opt_type == 'CALL' else 95000 + (atm - strike) * 180
-                    iv = 12.0 + ((strike - atm) / 1000.0)
-                    chain.append({
-                        'symbol': symbol,
-                        'strike': strike,
-                        'type': opt_type,
-                        'expiry': datetime.now().strftime('%Y-%m-%d'),
-                        'oi': max(int(oi), 1000),
-                        'iv': max(iv, 5.0),
-                        'ltp': ltp,
-                        'bid': bid,
-                        'ask': ask
-                    })
-            return chain
+            spot_info = await self.get_underlying_price(instrument_key)
+            return _synthetic_chain(instrument_key, spot_info.get('last_price', 0.0), datetime.now().strftime('%Y-%m-%d'))
 
     def get_option_contracts(self, instrument_key: str) -> List[Dict[str, Any]]:
         """Fetch option contracts for the given underlying instrument key."""
         try:
-            response = self.options_api.get_option_contracts(instrument_key)
             contracts = []
-            for contract in response.data:
+            for contract in self._raw_option_contracts(instrument_key):
                 contracts.append({
                     'strike': contract.strike_price,
-                    'kind': 'CALL' if contract.instrument_type == 'CE' else 'PUT',
+                    'kind': _CALL if contract.instrument_type == 'CE' else _PUT,
                     'expiry': contract.expiry.strftime('%Y-%m-%d') if contract.expiry else None,
                     'trading_symbol': contract.trading_symbol or contract.instrument_key
                 })
@@ -430,62 +724,12 @@ class BrokerRest:
         return underlying_symbol
 
     def _calculate_date_range(self, timeframe: str, limit: int) -> tuple:
-        """Calculate from_date and to_date based on timeframe & desired candles.
-
-        We approximate number of bars per trading day on NSE:
-          - Trading session ~ 9:15 to 15:30 => 6h15m => 375 minutes.
-          - For minute intervals: bars_per_day = floor(375 / interval_minutes).
-          - For hour intervals: bars_per_day = floor(6.25 / interval_hours).
-          - For daily timeframe: 1 bar per day.
-
-        If limit exceeds bars_per_day, we extend from_date backwards enough days.
-        Always set to_date to yesterday to avoid partial current day data.
-        """
-        from datetime import datetime, timedelta
-        to_date = datetime.now() - timedelta(days=1)
-
-        # Determine bars per day for given timeframe
-        tf = timeframe.lower()
-        bars_per_day = 1
-        if tf.endswith("m"):
-            try:
-                interval = int(tf[:-1])
-                trading_minutes = 375
-                bars_per_day = max(1, trading_minutes // interval)
-            except ValueError:
-                bars_per_day = 375
-        elif tf.endswith("h"):
-            try:
-                interval_h = int(tf[:-1])
-                trading_hours = 6.25  # 6h15m session
-                bars_per_day = max(1, int(trading_hours // interval_h))
-            except ValueError:
-                bars_per_day = 6
-        elif tf.endswith("d"):
-            bars_per_day = 1
-
-        days_needed = max(1, math.ceil(limit / bars_per_day))
-        from_date = to_date - timedelta(days=days_needed)
-
-        to_date_str = to_date.strftime("%Y-%m-%d")
-        from_date_str = from_date.strftime("%Y-%m-%d")
-        logger.debug(
-            "Date range calc timeframe=%s limit=%d bars_per_day=%d days_needed=%d from=%s to=%s",
-            timeframe, limit, bars_per_day, days_needed, from_date_str, to_date_str
-        )
-        return from_date_str, to_date_str
+        """Calculate from_date and to_date based on timeframe & desired candles (see _date_range_for)."""
+        return _date_range_for(timeframe, limit, date.today().isoformat())
 
     def _convert_interval(self, interval: str) -> tuple:
         """Convert interval format to Upstox interval and unit."""
-        interval_map = {
-            "1m": (1, "minutes"),
-            "5m": (5, "minutes"), 
-            "15m": (15, "minutes"),
-            "30m": (30, "minutes"),
-            "1h": (1, "hours"),
-            "1d": (1, "days")
-        }
-        return interval_map.get(interval, (1, "minutes"))
+        return _INTERVAL_MAP.get(interval, (1, "minutes"))
 
     def _convert_symbol(self, symbol: str) -> str:
         """Convert symbol to Upstox instrument token format using instruments.py mapping."""
@@ -497,22 +741,16 @@ class BrokerRest:
         logger.warning(f"Symbol {symbol} not found in instrument mapping, using fallback")
         return f"NSE_EQ|{symbol}"
 
-    def _get_instrument_token(self, symbol: str) -> str:
-        """Get instrument token for symbol."""
-        return self._convert_symbol(symbol)
-
     def _convert_order_type(self, order_type: str) -> str:
         """Convert order type to Upstox format."""
-        if order_type.upper() == "MARKET":
-            return upstox_client.OrderType.MARKET
-        elif order_type.upper() == "LIMIT":
-            return upstox_client.OrderType.LIMIT
-        else:
-            return upstox_client.OrderType.MARKET
+        order = _ORDER_TYPE_MAP.get(order_type)
+        if order is None:
+            order = _ORDER_TYPE_MAP.get(order_type.upper(), OrderType.MARKET.value)
+        return order
 
     def _convert_side(self, side: str) -> str:
         """Convert side to Upstox transaction type."""
-        if side.upper() == "BUY":
-            return upstox_client.TransactionType.BUY
-        else:
-            return upstox_client.TransactionType.SELL
+        txn = _SIDE_MAP.get(side)
+        if txn is None:
+            txn = TransactionType.BUY.value if side.upper() == "BUY" else TransactionType.SELL.value
+        return txn
@@ -1,10 +1,9 @@
 import asyncio
 import logging
-from typing import Callable, Dict, List
+from typing import Callable, Dict, List, Optional
 
 try:
     import upstox_client
-    from google.protobuf.json_format import MessageToDict
     from upstox_client import ApiClient, MarketDataStreamerV3
     print(f"DEBUG: broker_ws successfully imported upstox_client: {upstox_client}")
 except ImportError as e:
@@ -12,27 +11,68 @@ except ImportError as e:
     upstox_client = None
     ApiClient = None
     MarketDataStreamerV3 = None
-    MessageToDict = None
 
 from src.utils.instruments import (get_instruments, get_symbol_to_key_mapping)
 from src.utils.time_utils import parse_timestamp
 
 logger = logging.getLogger("broker_ws")
 
+_TICK_QUEUE_MAX = 10000
+_TICK_BATCH_MAX = 256
+
+
+if MarketDataStreamerV3 is not None:
+    class _RawFeedStreamer(MarketDataStreamerV3):
+        """Emits the decoded FeedResponse protobuf; the stock streamer runs MessageToDict on every frame."""
+
+        def handle_message(self, ws, message):
+            self.emit(self.Event["MESSAGE"], self.decode_protobuf(message))
+
+
+def _protobuf_ltpcs(message):
+    """(instrument_key, ltp, ltt, volume) per LTPC feed of a FeedResponse, read straight off the protobuf."""
+    for instrument_key, feed in message.feeds.items():
+        if feed.HasField('ltpc'):
+            ltpc = feed.ltpc
+            # LTPC feeds carry no traded volume; count each tick as 1 as the dict path does
+            yield instrument_key, ltpc.ltp, ltpc.ltt, 1
+
+
+def _dict_ltpcs(parsed: dict):
+    """Same as _protobuf_ltpcs for an already dict-decoded message."""
+    for instrument_key, feed_data in parsed['feeds'].items():
+        ltpc = feed_data.get('ltpc')
+        if ltpc is not None:
+            yield instrument_key, ltpc.get('ltp', 0.0), ltpc.get('ltt', ''), feed_data.get('vtt', 1)
+
 class BrokerWS:
     """Simplified Upstox WebSocket client for market data streaming."""
 
-    def __init__(self, access_token: str):
-        """Initialize WebSocket client with API key."""
+    def __init__(self, access_token: str, batch_ticks: bool = True):
+        """Initialize WebSocket client with API key.
+
+        With batch_ticks the SDK thread hands ticks to an asyncio.Queue drained on the loop in batches.
+        on_tick_batch is awaited per batch in order; an on_tick-only consumer still gets one task per
+        tick, so a slow callback doesn't hold up the ticks behind it. Without batch_ticks each tick is
+        scheduled from the SDK thread as its own coroutine.
+        """
         if upstox_client is None:
             logger.error("Upstox SDK not installed. Install with: pip install upstox-python-sdk")
             raise ImportError("Upstox SDK required")
 
         self.access_token = access_token
         self.streamer = None
+        self._api_client = None
+        self._subscribed: set = set()
         self.on_tick: Callable = None
+        self.on_tick_batch: Optional[Callable] = None
         self._running = False
         self._loop = None
+        self._batch_ticks = batch_ticks
+        self._tick_queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        # Strong references to running on_tick tasks until they finish
+        self._tick_tasks: set = set()
         self.instrument_to_symbol: Dict[str, str] = {}
         
         # Load symbol mapping from configuration
@@ -49,6 +89,9 @@ class BrokerWS:
             logger.info("WebSocket already connected")
             return
         self._loop = asyncio.get_running_loop()
+        if self._batch_ticks and (self._consumer is None or self._consumer.done()):
+            self._tick_queue = asyncio.Queue(maxsize=_TICK_QUEUE_MAX)
+            self._consumer = self._loop.create_task(self._drain_ticks())
         self._running = True
         logger.info("Upstox WebSocket connection initiated")
 
@@ -62,6 +105,11 @@ class BrokerWS:
                 logger.info("Upstox WebSocket disconnected")
             except Exception as e:
                 logger.warning(f"Error during WebSocket disconnect: {e}")
+        self._subscribed = set()
+        if self._consumer is not None:
+            self._consumer.cancel()
+            self._consumer = None
+            self._tick_queue = None
         self._running = False
 
     async def subscribe(self, symbols: List[str]):
@@ -108,17 +156,17 @@ class BrokerWS:
                     self.instrument_to_symbol[instrument_key] = symbol_or_category
 
             # Remove duplicates while preserving order
-            unique_keys = []
-            seen = set()
-            for key in all_instrument_keys:
-                if key not in seen:
-                    unique_keys.append(key)
-                    seen.add(key)
+            unique_keys = list(dict.fromkeys(all_instrument_keys))
 
             if not unique_keys:
                 logger.warning(f"No valid instruments found for: {symbols}")
                 return
 
+            # Live streamer: only send the difference instead of reconnecting
+            if self.streamer and self._subscribed and self._resubscribe(unique_keys):
+                logger.info(f"Subscribed to {len(unique_keys)} instruments from input: {symbols}")
+                return
+
             # Disconnect any existing streamer before creating a new one
             if self.streamer:
                 try:
@@ -129,53 +177,113 @@ class BrokerWS:
                 self.streamer = None
 
             # Initialize Upstox streamer
-            config = upstox_client.Configuration()
-            config.access_token = self.access_token
-            api_client = ApiClient(config)
-            self.streamer = MarketDataStreamerV3(api_client, unique_keys, "ltpc")
+            self.streamer = _RawFeedStreamer(self._get_api_client(), unique_keys, "ltpc")
             self.streamer.on("message", self._process_message)
             self.streamer.on("error", self._handle_error)
             self.streamer.on("close", self._handle_close)
             self.streamer.connect()
+            self._subscribed = set(unique_keys)
             
             logger.info(f"Subscribed to {len(unique_keys)} instruments from input: {symbols}")
-            logger.info(f"Instruments: {list(set(all_symbols))[:10]}{'...' if len(all_symbols) > 10 else ''}")
+            logger.info(f"Instruments: {all_symbols[:10]}{'...' if len(all_symbols) > 10 else ''}")
             
         except Exception as e:
             logger.error(f"Failed to subscribe to symbols {symbols}: {e}")
             raise
 
+    def _get_api_client(self):
+        """ApiClient (and its HTTP pool) built once and reused across resubscribes."""
+        if self._api_client is None:
+            config = upstox_client.Configuration()
+            config.access_token = self.access_token
+            self._api_client = ApiClient(config)
+        return self._api_client
+
     def _process_message(self, message):
         """Process incoming WebSocket message synchronously."""
         try:
-            parsed = MessageToDict(message) if MessageToDict and hasattr(message, 'DESCRIPTOR') else message
-            if not isinstance(parsed, dict) or 'feeds' not in parsed:
-                logger.warning(f"Invalid message structure: {parsed}")
+            if hasattr(message, 'DESCRIPTOR'):
+                ltpcs = _protobuf_ltpcs(message)
+            elif isinstance(message, dict) and 'feeds' in message:
+                ltpcs = _dict_ltpcs(message)
+            else:
+                logger.warning(f"Invalid message structure: {message}")
                 return
 
-            for instrument_key, feed_data in parsed['feeds'].items():
-                if 'ltpc' not in feed_data:
-                    continue
-
-                ltpc = feed_data['ltpc']
-                symbol = self.instrument_to_symbol.get(instrument_key, instrument_key.split("|")[-1])
-                tick = {
-                    "symbol": symbol,
-                    "instrument_key": instrument_key,
-                    "price": float(ltpc.get('ltp', 0.0)),
-                    "volume": int(feed_data.get('vtt', 1)),
-                    "ts": parse_timestamp(ltpc.get('ltt', ''))
-                }
-
-                if self.on_tick:
-                    # Schedule async callback in the event loop
-                    if self._loop and not self._loop.is_closed():
-                        asyncio.run_coroutine_threadsafe(self.on_tick(tick), self._loop)
-                    else:
-                        logger.warning("Event loop not available for async callback")
+            sym_get = self.instrument_to_symbol.get
+            ticks = [{
+                "symbol": sym_get(instrument_key) or instrument_key.split("|")[-1],
+                "instrument_key": instrument_key,
+                "price": float(ltp),
+                "volume": int(volume),
+                "ts": parse_timestamp(ltt)
+            } for instrument_key, ltp, ltt, volume in ltpcs]
+            if not ticks or not (self.on_tick or self.on_tick_batch):
+                return
+            if not self._loop or self._loop.is_closed():
+                logger.warning("Event loop not available for async callback")
+                return
+            if self._tick_queue is not None:
+                # One loop wakeup per message; the consumer task runs the callbacks
+                self._loop.call_soon_threadsafe(self._enqueue_ticks, ticks)
+            elif self.on_tick:
+                # Schedule async callback in the event loop
+                for tick in ticks:
+                    asyncio.run_coroutine_threadsafe(self.on_tick(tick), self._loop)
         except Exception as e:
             logger.error(f"Error processing message: {e}")
 
+    def _resubscribe(self, unique_keys: List[str]) -> bool:
+        """Diff against the current subscription on the open streamer; False if the socket can't take it."""
+        wanted = set(unique_keys)
+        to_add = [k for k in unique_keys if k not in self._subscribed]
+        to_remove = [k for k in self._subscribed if k not in wanted]
+        try:
+            if to_remove:
+                self.streamer.unsubscribe(to_remove)
+            if to_add:
+                self.streamer.subscribe(to_add, "ltpc")
+        except Exception as e:
+            logger.warning(f"Incremental resubscribe failed ({e}); reconnecting streamer")
+            return False
+        self._subscribed = wanted
+        logger.info(f"Resubscribed: +{len(to_add)} -{len(to_remove)} instruments")
+        return True
+
+    def _enqueue_ticks(self, ticks: List[dict]):
+        """Runs on the event loop (via call_soon_threadsafe)."""
+        queue = self._tick_queue
+        if queue is None:
+            return
+        for tick in ticks:
+            try:
+                queue.put_nowait(tick)
+            except asyncio.QueueFull:
+                logger.warning("Tick queue full (%d); dropping tick for %s", queue.maxsize, tick["instrument_key"])
+
+    async def _drain_ticks(self):
+        queue = self._tick_queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < _TICK_BATCH_MAX and not queue.empty():
+                batch.append(queue.get_nowait())
+            if self.on_tick_batch:
+                try:
+                    await self.on_tick_batch(batch)
+                except Exception as e:
+                    logger.error(f"Error in tick batch callback: {e}")
+            elif self.on_tick:
+                for tick in batch:
+                    task = asyncio.create_task(self._run_tick(tick))
+                    self._tick_tasks.add(task)
+                    task.add_done_callback(self._tick_tasks.discard)
+
+    async def _run_tick(self, tick: dict):
+        try:
+            await self.on_tick(tick)
+        except Exception as e:
+            logger.error(f"Error in tick callback for {tick['instrument_key']}: {e}")
+
     def _handle_error(self, error):
         """Handle WebSocket errors."""
         logger.error(f"WebSocket error: {error}")
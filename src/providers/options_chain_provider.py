@@ -1,7 +1,10 @@
+import asyncio
 import logging
+import math
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from src.models.option_models import OptionContract
@@ -9,97 +12,260 @@ from src.utils.time_utils import now_ist
 
 logger = logging.getLogger("options_provider")
 
+_CONTRACTS_TTL_SEC = 3600
+_KIND_ALIASES = {"CE": "CALL", "PE": "PUT"}
+
+
+async def _no_contracts() -> list:
+    return []
+
+
+async def _no_futures_price() -> float:
+    return 0.0
+
+
+def _parse_expiry(value: str):
+    try:
+        return pd.to_datetime(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _numeric(df: pd.DataFrame, column: str, default) -> pd.Series:
+    """Column as numbers with missing/unparsable values replaced by `default` (a scalar or aligned Series)."""
+    if column not in df.columns:
+        return default.copy() if isinstance(default, pd.Series) else pd.Series(default, index=df.index)
+    return pd.to_numeric(df[column], errors="coerce").fillna(default)
+
+
+_OPTIONAL_COLUMNS = ("delta", "gamma", "theta", "vega", "trading_symbol", "rho")
+_CHAIN_COLUMNS = {
+    "symbol": object, "strike": np.int64, "kind": object, "expiry": object, "oi": np.int64,
+    "oi_prev": np.float64, "iv": np.float64, "ltp": np.float64, "bid": np.float64, "ask": np.float64,
+    **{c: object for c in _OPTIONAL_COLUMNS},
+}
+
+
+def _empty_chain_columns() -> Dict[str, np.ndarray]:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in _CHAIN_COLUMNS.items()}
+
+
+def _contracts_from_columns(columns: Dict[str, np.ndarray], ts_now) -> List[OptionContract]:
+    oi_prev = [None if math.isnan(v) else int(v) for v in columns["oi_prev"].tolist()]
+    return [
+        OptionContract(
+            symbol=symbol,
+            strike=strike,
+            kind=kind,
+            expiry=expiry,
+            oi=oi,
+            oi_prev=prev,
+            iv=iv,
+            ltp=ltp,
+            bid=bid,
+            ask=ask,
+            timestamp=ts_now,
+            delta=delta,
+            gamma=gamma,
+            theta=theta,
+            vega=vega,
+            trading_symbol=trading_symbol,  # If available in raw data
+            rho=rho
+        )
+        for symbol, strike, kind, expiry, oi, prev, iv, ltp, bid, ask, delta, gamma, theta, vega, trading_symbol, rho in zip(
+            columns["symbol"].tolist(), columns["strike"].tolist(), columns["kind"].tolist(), columns["expiry"].tolist(),
+            columns["oi"].tolist(), oi_prev, columns["iv"].tolist(), columns["ltp"].tolist(), columns["bid"].tolist(),
+            columns["ask"].tolist(), *(columns[c].tolist() for c in _OPTIONAL_COLUMNS),
+        )
+    ]
+
+
+def _optional(df: pd.DataFrame, column: str) -> list:
+    """Column values with NaN/missing mapped to None."""
+    if column not in df.columns:
+        return [None] * len(df)
+    col = df[column].astype(object)
+    return col.where(col.notna(), None).tolist()
+
 class OptionsChainProvider:
     """Fetch futures price and option chain; keeps last snapshot for OI change and debounce."""
-    def __init__(self, rest_client, instrument_symbol: str = None):
+    def __init__(self, rest_client, instrument_symbol: str = None, enable_trading_symbols: bool = True):
         self.rest = rest_client
+        # Trading symbols need the contract metadata call; greeks/OI-only consumers can skip it
+        self.enable_trading_symbols = enable_trading_symbols
         # Delay binding until first tick if not provided
         self.instrument_symbol = instrument_symbol
         self._last_chain: Dict[str, OptionContract] = {}
         self._last_fetch_ts: float = 0.0
+        # Running count of raw chain rows rejected by _parse_raw_chain_columns
+        self.dropped_rows = 0
+        # Same snapshot as _last_chain, column-wise for vectorised consumers
+        self._chain_arrays: Dict[str, np.ndarray] = _empty_chain_columns()
+        # Contract metadata is static within an expiry cycle: instrument -> (monotonic ts, contracts)
+        self._contracts_cache: Dict[str, Tuple[float, list]] = {}
+        # instrument -> fetch in progress, so concurrent cache misses share one REST call
+        self._contracts_inflight: Dict[str, asyncio.Future] = {}
+        # (strike, kind, expiry ns) -> trading_symbol, valid while the chain's key set hashes to _universe_hash
+        self._symbol_index: Optional[Dict[tuple, str]] = None
+        self._universe_hash: Optional[int] = None
 
     def set_instrument(self, instrument_symbol: str):
         """Update instrument symbol (e.g., from WebSocket tick instrument_key mapping)."""
         if instrument_symbol and instrument_symbol != self.instrument_symbol:
             logger.info("OptionsChainProvider instrument updated %s -> %s", self.instrument_symbol, instrument_symbol)
             self.instrument_symbol = instrument_symbol
+            self._symbol_index = None
 
-    def fetch_futures_price(self) -> float:
+    async def fetch_futures_price(self) -> float:
         if not self.instrument_symbol:
             return 0.0
         try:
-            data = self.rest.get_underlying_price(self.instrument_symbol)
+            data = await self.rest.get_underlying_price(self.instrument_symbol)
             return float(data.get("last_price", 0.0))
         except Exception as e:
             logger.warning("Futures price fetch failed: %s", e)
             return 0.0
 
-    def fetch_option_chain(self) -> List[OptionContract]:
+    async def _fetch_option_contracts(self) -> list:
+        """Contract metadata (strike/kind/expiry/trading_symbol), cached for _CONTRACTS_TTL_SEC per instrument.
+
+        The REST call is blocking, so a miss runs it off-loop; concurrent misses wait on the same call.
+        """
+        symbol = self.instrument_symbol
+        cached = self._contracts_cache.get(symbol)
+        if cached and time.monotonic() - cached[0] < _CONTRACTS_TTL_SEC:
+            return cached[1]
+        inflight = self._contracts_inflight.get(symbol)
+        if inflight is None:
+            inflight = self._contracts_inflight[symbol] = asyncio.ensure_future(self._load_option_contracts(symbol))
+            inflight.add_done_callback(lambda _: self._contracts_inflight.pop(symbol, None))
+        # Shielded so one cancelled caller doesn't cancel the fetch the others are waiting on
+        return await asyncio.shield(inflight)
+
+    async def _load_option_contracts(self, symbol: str) -> list:
+        loop = asyncio.get_running_loop()
+        contracts = await loop.run_in_executor(None, self.rest.get_option_contracts, symbol)
+        if contracts:
+            self._contracts_cache[symbol] = (time.monotonic(), contracts)
+        return contracts
+
+    async def fetch_option_chain(self) -> List[OptionContract]:
+        chain, _ = await self._refresh(with_futures=False)
+        return chain
+
+    async def refresh(self) -> Tuple[List[OptionContract], float]:
+        """Fetch chain, futures price and contract metadata concurrently; returns (chain, futures_price)."""
+        return await self._refresh(with_futures=True)
+
+    async def _refresh(self, with_futures: bool) -> Tuple[List[OptionContract], float]:
         ts_now = now_ist()
         if not self.instrument_symbol:
-            return list(self._last_chain.values())
-        try:
-            raw_chain = self.rest.get_option_chain(self.instrument_symbol)
-        except Exception as e:
-            logger.warning("Option chain fetch failed: %s", e)
-            return list(self._last_chain.values())
-        new_contracts = self._parse_raw_chain(raw_chain, ts_now)
+            return list(self._last_chain.values()), 0.0
+        # Contract metadata is only needed until we hold a trading-symbol index for the current universe
+        need_contracts = self.enable_trading_symbols and self._symbol_index is None
+        calls = [self.rest.get_option_chain(self.instrument_symbol),
+                 self._fetch_option_contracts() if need_contracts else _no_contracts(),
+                 self.fetch_futures_price() if with_futures else _no_futures_price()]
+        raw_chain, contracts, futures_price = await asyncio.gather(*calls, return_exceptions=True)
+        if isinstance(futures_price, BaseException):
+            futures_price = 0.0
+        if isinstance(raw_chain, BaseException):
+            logger.warning("Option chain fetch failed: %s", raw_chain)
+            return list(self._last_chain.values()), futures_price
+        columns = self._parse_raw_chain_columns(raw_chain, ts_now)
+        new_contracts = _contracts_from_columns(columns, ts_now)
+        self._chain_arrays = columns
         self._last_chain = {c.symbol: c for c in new_contracts}
         self._last_fetch_ts = time.time()
-        self._map_trading_symbols(new_contracts)
-        return new_contracts
+        if self.enable_trading_symbols and new_contracts:
+            if isinstance(contracts, BaseException):
+                logger.debug("get_option_contracts failed for trading symbol mapping: %s", contracts)
+                contracts = None
+            await self._map_trading_symbols(new_contracts, columns, contracts if need_contracts else None)
+        return new_contracts, futures_price
 
     def _parse_raw_chain(self, raw_chain, ts_now) -> List[OptionContract]:
-        new_contracts = []
-        for item in raw_chain:
-            try:
-                symbol = item["symbol"]  # Underlying symbol
-                strike = int(item["strike"])
-                kind = item["type"].upper()  # CE/PE
-                if kind == "CE":
-                    kind = "CALL"
-                elif kind == "PE":
-                    kind = "PUT"
-                expiry_val = item.get("expiry")
-                expiry = pd.to_datetime(expiry_val) if isinstance(expiry_val, str) else ts_now
-                oi = int(item.get("oi", 0))
-                iv = float(item.get("iv", 0.0))
-                ltp = float(item.get("ltp", 0.0))
-                bid = float(item.get("bid", ltp))
-                ask = float(item.get("ask", ltp))
-                prev = self._last_chain.get(symbol)
-                oc = OptionContract(
-                    symbol=symbol,
-                    strike=strike,
-                    kind=kind,
-                    expiry=expiry,
-                    oi=oi,
-                    oi_prev=prev.oi if prev else None,
-                    iv=iv,
-                    ltp=ltp,
-                    bid=bid,
-                    ask=ask,
-                    timestamp=ts_now,
-                    delta=item.get('delta'),
-                    gamma=item.get('gamma'),
-                    theta=item.get('theta'),
-                    vega=item.get('vega'),
-                    trading_symbol=item.get('trading_symbol')  # If available in raw data
-                )
-                new_contracts.append(oc)
-            except Exception as e:
-                logger.debug("Chain item parse failed: %s item=%s", e, item)
-        return new_contracts
-
-    def _map_trading_symbols(self, new_contracts):
+        return _contracts_from_columns(self._parse_raw_chain_columns(raw_chain, ts_now), ts_now)
+
+    def _parse_raw_chain_columns(self, raw_chain, ts_now) -> Dict[str, np.ndarray]:
+        """Raw rows as aligned typed arrays (see _CHAIN_COLUMNS), cast column-wise.
+
+        Rows missing symbol/strike/type or with a bad expiry are dropped; oi_prev is NaN when unseen.
+        """
+        if not raw_chain:
+            return _empty_chain_columns()
+        try:
+            df = pd.DataFrame(raw_chain)
+            if not {"symbol", "strike", "type"}.issubset(df.columns):
+                logger.debug("Chain missing required columns: %s", list(df.columns))
+                return _empty_chain_columns()
+            strike = pd.to_numeric(df["strike"], errors="coerce")
+            kind = df["type"].str.upper().replace(_KIND_ALIASES)
+            # Each distinct expiry string is parsed once; non-string expiries mean "now", unparsable ones drop the row
+            expiry_raw = df["expiry"] if "expiry" in df.columns else pd.Series(None, index=df.index, dtype=object)
+            parsed = {v: _parse_expiry(v) for v in set(expiry_raw.tolist()) if isinstance(v, str)}
+            expiry = np.array([parsed[v] if isinstance(v, str) else ts_now for v in expiry_raw.tolist()], dtype=object)
+            valid = (df["symbol"].notna() & strike.notna() & kind.notna()).to_numpy() & (expiry != None)  # noqa: E711
+            if not valid.all():
+                dropped = int((~valid).sum())
+                self.dropped_rows += dropped
+                logger.debug("Dropped %d unparsable chain rows", dropped)
+                df = df[valid]
+            ltp = _numeric(df, "ltp", 0.0)
+            prev_oi = {s: c.oi for s, c in self._last_chain.items()}
+            columns = {
+                "symbol": df["symbol"].to_numpy(dtype=object),
+                "strike": strike[valid].astype("int64").to_numpy(),
+                "kind": kind[valid].to_numpy(dtype=object),
+                "expiry": expiry[valid],
+                "oi": _numeric(df, "oi", 0).astype("int64").to_numpy(),
+                "oi_prev": df["symbol"].map(prev_oi).astype("float64").to_numpy(),
+                "iv": _numeric(df, "iv", 0.0).to_numpy(dtype="float64"),
+                "ltp": ltp.to_numpy(dtype="float64"),
+                "bid": _numeric(df, "bid", ltp).to_numpy(dtype="float64"),
+                "ask": _numeric(df, "ask", ltp).to_numpy(dtype="float64"),
+            }
+            for c in _OPTIONAL_COLUMNS:
+                columns[c] = np.array(_optional(df, c), dtype=object)
+            return columns
+        except Exception as e:
+            logger.debug("Chain parse failed: %s", e)
+            return _empty_chain_columns()
+
+    def get_chain_arrays(self) -> Dict[str, np.ndarray]:
+        """Latest snapshot as aligned NumPy arrays (same order as the last fetched chain)."""
+        return self._chain_arrays
+
+    async def _map_trading_symbols(self, new_contracts, columns, contracts=None):
+        """Fill trading_symbol from contract metadata, indexed by (strike, kind, expiry ns).
+
+        The index is rebuilt (fetching metadata if not supplied) only when that set of keys changes;
+        a change means strikes were listed or expired, so the TTL-cached metadata is refetched.
+        """
         try:
-            contracts = self.rest.get_option_contracts(self.instrument_symbol)
-            for oc in new_contracts:
-                matching = next((c for c in contracts if c.get('strike') == oc.strike and c.get('kind') == oc.kind and pd.to_datetime(c.get('expiry')) == oc.expiry), None)
-                if matching and 'trading_symbol' in matching:
-                    oc.trading_symbol = matching['trading_symbol']
+            keys = list(zip(columns["strike"].tolist(), columns["kind"].tolist(),
+                            (pd.Timestamp(e).value for e in columns["expiry"].tolist())))
+            universe = hash(frozenset(keys))
+            if self._symbol_index is None or universe != self._universe_hash:
+                if contracts is None:
+                    if self._symbol_index is not None:
+                        self._contracts_cache.pop(self.instrument_symbol, None)
+                    contracts = await self._fetch_option_contracts()
+                if not contracts:
+                    return
+                self._symbol_index = {
+                    (int(c['strike']), c['kind'], pd.Timestamp(c['expiry']).value): c['trading_symbol']
+                    for c in contracts
+                    if 'trading_symbol' in c and c.get('strike') is not None and c.get('expiry')
+                }
+                self._universe_hash = universe
+            index_get = self._symbol_index.get
+            for oc, key in zip(new_contracts, keys):
+                trading_symbol = index_get(key)
+                if trading_symbol is not None:
+                    oc.trading_symbol = trading_symbol
         except Exception as e:
-            logger.debug("get_option_contracts failed for trading symbol mapping: %s", e)
+            logger.debug("Trading symbol mapping failed: %s", e)
 
     def last_snapshot_age(self) -> float:
         return time.time() - self._last_fetch_ts if self._last_fetch_ts else 1e9
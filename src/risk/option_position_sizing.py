@@ -1,8 +1,14 @@
 from math import floor
-from typing import Dict
+from typing import Dict, Sequence
+
+import numpy as np
 
 from src.models.option_models import OptionContract
 
+# (target_move_pct, stop_move_pct) on the option premium
+_SCALPER_MOVES = (0.20, 0.12)
+_DEFAULT_MOVES = (0.35, 0.20)
+
 
 def compute_option_position(contract: OptionContract,
                             underlying_side: str,
@@ -12,12 +18,7 @@ def compute_option_position(contract: OptionContract,
     premium = contract.ltp
     if premium <= 0:
         return {'lots': 0, 'stop': premium, 'target': premium}
-    if mode == 'scalper':
-        target_move_pct = 0.20
-        stop_move_pct = 0.12
-    else:
-        target_move_pct = 0.35
-        stop_move_pct = 0.20
+    target_move_pct, stop_move_pct = _SCALPER_MOVES if mode == 'scalper' else _DEFAULT_MOVES
     target = premium * (1 + target_move_pct)
     stop = premium * (1 - stop_move_pct)
     per_lot_risk = (premium - stop) * lot_size
@@ -25,3 +26,24 @@ def compute_option_position(contract: OptionContract,
         return {'lots': 0, 'stop': stop, 'target': target}
     lots = floor(account_risk_cap / per_lot_risk)
     return {'lots': max(lots, 0), 'stop': stop, 'target': target}
+
+
+def compute_option_positions(contracts: Sequence[OptionContract],
+                             underlying_side: str,
+                             account_risk_cap: float,
+                             lot_size: int,
+                             mode: str) -> Dict[str, np.ndarray]:
+    """compute_option_position for many contracts at once: aligned 'lots' (int64), 'stop' and 'target' arrays.
+
+    The scalar version stays separate because sizing a single contract is cheaper without NumPy.
+    """
+    premium = np.fromiter((c.ltp for c in contracts), dtype=np.float64, count=len(contracts))
+    target_move_pct, stop_move_pct = _SCALPER_MOVES if mode == 'scalper' else _DEFAULT_MOVES
+    valid = premium > 0
+    target = np.where(valid, premium * (1 + target_move_pct), premium)
+    stop = np.where(valid, premium * (1 - stop_move_pct), premium)
+    per_lot_risk = (premium - stop) * lot_size
+    sized = valid & (per_lot_risk > 0)
+    lots = np.zeros(len(premium), dtype=np.int64)
+    lots[sized] = np.maximum(np.floor(account_risk_cap / per_lot_risk[sized]), 0)
+    return {'lots': lots, 'stop': stop, 'target': target}
@@ -4,14 +4,19 @@ Examples (run from project root):
   python -m src.scripts.backfill_historical --inputs nifty
   python -m src.scripts.backfill_historical --inputs nifty,indices
   python -m src.scripts.backfill_historical --inputs RELIANCE,TCS
+  python -m src.scripts.backfill_historical --inputs nifty,indices --workers 4
 
 Categories and symbols are resolved via instruments file (see src/utils/instruments.py).
 """
 import argparse
 import asyncio
+import atexit
 import logging
+import multiprocessing
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List
 
 # Path bootstrap to allow direct execution without -m
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
@@ -26,17 +31,65 @@ from src.utils.instruments import resolve_instruments
 
 logger = logging.getLogger("backfill")
 
+# Instruments coalesced into one DB transaction by the writer
+_WRITE_BATCH_MAX = 32
+
 def parse_args():
     p = argparse.ArgumentParser(description="Backfill historical candles to DB from broker REST")
     p.add_argument("--inputs", required=True, help="Comma-separated categories or symbols (e.g. nifty,RELIANCE,TCS)")
     p.add_argument("--timeframe", default="1m", help="Timeframe (default 1m)")
     p.add_argument("--limit", type=int, default=300, help="Number of candles to fetch per instrument")
+    p.add_argument("--workers", type=int, default=1, help="Worker processes to split instruments across (default 1)")
     return p.parse_args()
 
-async def run(raw_inputs: str, timeframe: str, limit: int):
-    db = Database(settings.DATABASE_URL)
-    await db.connect()
+async def _backfill(instruments: List[Dict], timeframe: str, limit: int):
+    """Fetch and persist one set of instruments with its own DB engine and REST client."""
+    db = await Database.get(settings.DATABASE_URL)
     rest = BrokerRest(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET, access_token=get_token())
+    concurrency = settings.BACKFILL_CONCURRENCY or 8
+    logger.info("Fetching %d instruments timeframe=%s limit=%d concurrency=%d",
+                len(instruments), timeframe, limit, concurrency)
+    # Fetchers feed a single writer so DB writes overlap the HTTP round-trips
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2 * concurrency)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def fetch(inst):
+        async with sem:
+            try:
+                candles = await rest.fetch_historical(inst['instrument_key'], timeframe, limit=limit)
+            except Exception as e:
+                logger.error("Error fetching %s: %s", inst['symbol'], e)
+                candles = []
+        await queue.put((inst, candles))
+
+    async def write():
+        done = False
+        while not done:
+            batch = [await queue.get()]
+            while len(batch) < _WRITE_BATCH_MAX and not queue.empty():
+                batch.append(queue.get_nowait())
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            # One COPY + merge per batch of instruments instead of row inserts per instrument
+            await db.persist_candles_copy_many([(inst['symbol'], inst['instrument_key'], timeframe, candles)
+                                                for inst, candles in batch])
+            for inst, candles in batch:
+                logger.info("Persisted %d candles for %s", len(candles), inst['symbol'])
+
+    # One shared client: concurrent fetches reuse the same pooled connections
+    writer = asyncio.create_task(write())
+    await asyncio.gather(*(fetch(inst) for inst in instruments))
+    await queue.put(None)
+    await writer
+    await rest.close()
+
+
+def _backfill_worker(instruments: List[Dict], timeframe: str, limit: int):
+    """ProcessPoolExecutor entry point: runs one slice of the backfill in a fresh event loop."""
+    asyncio.run(_backfill(instruments, timeframe, limit))
+
+async def run(raw_inputs: str, timeframe: str, limit: int, workers: int = 1):
     inputs = [s.strip() for s in raw_inputs.split(',') if s.strip()]
     instruments = []
     for inp in inputs:
@@ -47,18 +100,27 @@ async def run(raw_inputs: str, timeframe: str, limit: int):
         uniq[inst['instrument_key']] = inst
     instruments = list(uniq.values())
     logger.info("Resolved %d instruments", len(instruments))
-    for inst in instruments:
-        symbol = inst['symbol']
-        instrument_key = inst['instrument_key']
-        logger.info("Fetching %s (%s) timeframe=%s limit=%d", symbol, instrument_key, timeframe, limit)
-        candles = await rest.fetch_historical(instrument_key, timeframe, limit=limit)
-        await db.persist_candles_bulk(symbol, instrument_key, timeframe, candles)
-        logger.info("Persisted %d candles for %s", len(candles), symbol)
-    await db.disconnect()
+    if workers <= 1 or len(instruments) <= 1:
+        await _backfill(instruments, timeframe, limit)
+        return
+    # Row conversion and CSV/COPY prep are CPU-bound: spread instruments round-robin over processes
+    chunks = [instruments[i::workers] for i in range(workers)]
+    # Create and seed the schema once here so workers don't race on it
+    schema_db = Database(settings.DATABASE_URL)
+    await schema_db.connect()
+    await schema_db.disconnect()
+    if schema_db.engine is not None:
+        schema_db.engine.dispose()
+    loop = asyncio.get_running_loop()
+    # Spawn rather than fork: this process already has a running loop and executor threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        await asyncio.gather(*(loop.run_in_executor(pool, _backfill_worker, chunk, timeframe, limit)
+                               for chunk in chunks if chunk))
 
 def main():
     args = parse_args()
-    asyncio.run(run(args.inputs, args.timeframe, args.limit))
+    atexit.register(Database.close_all)
+    asyncio.run(run(args.inputs, args.timeframe, args.limit, args.workers))
 
 if __name__ == "__main__":
     main()
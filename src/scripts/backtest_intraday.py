@@ -18,12 +18,17 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import atexit
+import logging
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
 from typing import List, Dict, Optional, Any
 import sys
 from pathlib import Path
 
+import numpy as np
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
@@ -34,11 +39,15 @@ from src.engine.ema import EMAState
 from src.engine.intraday_strategy import IntradayStrategy
 from src.scripts.common_utils import (
     autodetect_instrument_key,
-    load_warmup_and_day,
+    load_warmup_and_day_array,
+    rows_from_array,
     write_csv,
 )
 from src.services.options.options_manager import OptionsManager
 from src.providers.options_chain_provider import OptionsChainProvider
+from src.utils.instruments import get_symbol_to_key_mapping
+
+logger = logging.getLogger("backtest")
 
 @dataclass
 class Bar:
@@ -49,6 +58,9 @@ class Bar:
     close: float
     volume: int
 
+def _recent_bar(c: Dict) -> Dict:
+    return {'close': c['close'], 'open': c['open'], 'high': c['high'], 'low': c['low'], 'volume': c['volume']}
+
 class CaptureExecutor:
     def __init__(self):
         self.signals: List = []
@@ -74,75 +86,79 @@ class Harness:
         self.primary_tf = primary_tf
         self.confirm_tf = confirm_tf
         self.candles = candles or []
+        # Tail window of confirmation bars, built once from the candles passed in
+        self._recent = deque((_recent_bar(c) for c in self.candles[-settings.CONFIRMATION_RECENT_BARS:]),
+                             maxlen=settings.CONFIRMATION_RECENT_BARS)
         
-        # Load symbol to instrument key mapping
-        from src.utils.instruments import get_symbol_to_key_mapping
+        # Shared, process-wide cached mapping
         self.symbol_to_key = get_symbol_to_key_mapping()
         
         self.executor = CaptureExecutor()
         self.notifier = CaptureNotifier()
         self.option_signals: List = []
-        if settings.OPTION_ENABLE:
-            from src.auth.token_store import get_token
-            from src.providers.broker_rest import BrokerRest
-            access_token = get_token()
-            api_key = settings.UPSTOX_API_KEY
-            api_secret = settings.UPSTOX_API_SECRET
-            rest = BrokerRest(api_key, api_secret, access_token=access_token)
-            chain_provider = OptionsChainProvider(rest, instrument_key)
-            async def emit_callback(opt_signal):
-                await self.executor.handle_option_signal(opt_signal)
-                self.option_signals.append(opt_signal)
-            self.options_manager = OptionsManager(chain_provider, config={
-                'OPTION_ENABLE': settings.OPTION_ENABLE,
-                'OPTION_LOT_SIZE': settings.OPTION_LOT_SIZE,
-                'OPTION_RISK_CAP_PER_TRADE': settings.OPTION_RISK_CAP_PER_TRADE,
-                'OPTION_OI_MIN_PERCENTILE': settings.OPTION_OI_MIN_PERCENTILE,
-                'OPTION_SPREAD_MAX_PCT_SCALPER': settings.OPTION_SPREAD_MAX_PCT_SCALPER,
-                'OPTION_SPREAD_MAX_PCT_INTRADAY': settings.OPTION_SPREAD_MAX_PCT_INTRADAY,
-                'OPTION_DEBOUNCE_SEC': settings.OPTION_DEBOUNCE_SEC,
-                'OPTION_DEBOUNCE_INTRADAY_SEC': settings.OPTION_DEBOUNCE_INTRADAY_SEC,
-                'OPTION_COOLDOWN_SEC': settings.OPTION_COOLDOWN_SEC,
-            }, emit_callback=emit_callback)
-        else:
-            self.options_manager = None
+        # REST client and options manager are built on first use: diagnose runs without signals never need them
+        self._rest = None
+        self._options_manager = None
+        self._options_built = False
+        # Previous-day reference per (instrument_key, date): fetched once per replay instead of once per bar
+        self._daily_ref_cache: Dict[tuple, Dict[str, Any]] = {}
         self.db = None
         self.ema_primary = EMAState(instrument_key, primary_tf, settings.INTRADAY_EMA_SHORT, settings.INTRADAY_EMA_LONG)
         self.ema_confirm = EMAState(instrument_key, confirm_tf, settings.INTRADAY_EMA_SHORT, settings.INTRADAY_EMA_LONG) if confirm_tf != primary_tf else None
         self.strategy = IntradayStrategy(self, primary_tf, confirm_tf, settings.INTRADAY_EMA_SHORT, settings.INTRADAY_EMA_LONG)
     
+    @property
+    def rest(self):
+        """One REST client for the whole run (options chain and confirmation daily data share its connections)."""
+        if self._rest is None:
+            from src.auth.token_store import get_token
+            from src.providers.broker_rest import BrokerRest
+            self._rest = BrokerRest(settings.UPSTOX_API_KEY, settings.UPSTOX_API_SECRET, access_token=get_token())
+        return self._rest
+
+    @property
+    def options_manager(self) -> Optional[OptionsManager]:
+        if not self._options_built:
+            self._options_built = True
+            if settings.OPTION_ENABLE:
+                self._options_manager = self._build_options_manager()
+        return self._options_manager
+
+    def _build_options_manager(self) -> OptionsManager:
+        chain_provider = OptionsChainProvider(self.rest, self.instrument_key)
+        async def emit_callback(opt_signal):
+            await self.executor.handle_option_signal(opt_signal)
+            self.option_signals.append(opt_signal)
+        return OptionsManager(chain_provider, config={
+            'OPTION_ENABLE': settings.OPTION_ENABLE,
+            'OPTION_LOT_SIZE': settings.OPTION_LOT_SIZE,
+            'OPTION_RISK_CAP_PER_TRADE': settings.OPTION_RISK_CAP_PER_TRADE,
+            'OPTION_OI_MIN_PERCENTILE': settings.OPTION_OI_MIN_PERCENTILE,
+            'OPTION_SPREAD_MAX_PCT_SCALPER': settings.OPTION_SPREAD_MAX_PCT_SCALPER,
+            'OPTION_SPREAD_MAX_PCT_INTRADAY': settings.OPTION_SPREAD_MAX_PCT_INTRADAY,
+            'OPTION_DEBOUNCE_SEC': settings.OPTION_DEBOUNCE_SEC,
+            'OPTION_DEBOUNCE_INTRADAY_SEC': settings.OPTION_DEBOUNCE_INTRADAY_SEC,
+            'OPTION_COOLDOWN_SEC': settings.OPTION_COOLDOWN_SEC,
+        }, emit_callback=emit_callback)
+
     # Removed time-window gating; all trades allowed.
     async def _confirmation_ctx(self, symbol: str, timeframe: str):
         """Provide context for signal confirmation: recent bars and previous day reference using API daily data."""
         try:
             # Get recent bars for RSI/price action analysis
-            recent_bars = []
+            recent_bars = list(self._recent)
             instrument_key = self.symbol_to_key.get(symbol, symbol)
-            candles = self.candles[-settings.CONFIRMATION_RECENT_BARS:] if self.candles else []
-            if candles:
-                recent_bars = [{
-                    'close': c['close'],
-                    'open': c['open'],
-                    'high': c['high'],
-                    'low': c['low'],
-                    'volume': c['volume']
-                } for c in candles]
             
             # Get previous day OHLC using API for daily timeframe (accurate and reliable)
+            cache_key = (instrument_key, datetime.now().date().isoformat())
+            daily_ref = self._daily_ref_cache.get(cache_key)
+            if daily_ref is not None:
+                return recent_bars, daily_ref
             daily_ref = {"prev_high": None, "prev_low": None, "prev_close": None}
             
             try:
-                # Fetch daily historical data directly from API
-                from src.auth.token_store import get_token
-                from src.providers.broker_rest import BrokerRest
-                
-                access_token = get_token()
-                api_key = settings.UPSTOX_API_KEY
-                api_secret = settings.UPSTOX_API_SECRET
-                rest = BrokerRest(api_key, api_secret, access_token=access_token)
-                
                 # Get daily data for the past few days
-                daily_candles = await rest.fetch_historical(instrument_key, timeframe="1d", limit=5)
+                daily_candles = await self.rest.fetch_historical(instrument_key, timeframe="1d", limit=5)
                 
                 if len(daily_candles) >= 2:
                     # Second to last is previous day (last might be partial current day)
@@ -152,17 +168,18 @@ class Harness:
                         "prev_low": prev_day['low'],
                         "prev_close": prev_day['close']
                     }
-                    print(f"DEBUG: Using API daily data for {symbol}: prev_close={prev_day['close']:.2f}")
+                    logger.debug("Using API daily data for %s: prev_close=%.2f", symbol, prev_day['close'])
                 else:
-                    print(f"WARNING: Insufficient daily data from API for {symbol}")
+                    logger.warning("Insufficient daily data from API for %s", symbol)
+                self._daily_ref_cache[cache_key] = daily_ref
                     
             except Exception as e:
-                print(f"ERROR: Failed to fetch daily data from API for {symbol}: {e}")
-                # No fallback - if API fails, daily_ref remains None
+                logger.error("Failed to fetch daily data from API for %s: %s", symbol, e)
+                # No fallback - if API fails, daily_ref remains None (not cached, so the next bar retries)
             
             return recent_bars, daily_ref
         except Exception as e:
-            print(f"Failed to get confirmation context for {symbol}: {e}")
+            logger.error("Failed to get confirmation context for %s: %s", symbol, e)
             return [], {"prev_high": None, "prev_low": None, "prev_close": None}
 
 # -------- Args ---------
@@ -189,107 +206,137 @@ def parse_args():
 
 # -------- Diagnose Logic (mirrors scalper) ---------
 
+class _Bar:
+    """Minimal bar handed to on_bar_close in diagnose mode."""
+    __slots__ = ('close', 'ts')
+
+    def __init__(self, close: float, ts: str):
+        self.close = close
+        self.ts = ts
+
 DIAGNOSE_HEADERS = ['ts','price','prev_short','prev_long','curr_short','curr_long','prev_diff','curr_diff','threshold','detected_buy','detected_sell','strict_mode','skipped_warmup','signal_generated','signal_side']
 
-async def diagnose_crossovers(symbol: str, instrument_key: str, timeframe: str, warm: List[Dict], day_rows: List[Dict], threshold_pct: float, strict: bool, show_all: bool, disable_trend: bool, disable_confirmation: bool) -> List[Dict]:
+async def diagnose_crossovers(symbol: str, instrument_key: str, timeframe: str, candles: np.ndarray, n_warm: int, threshold_pct: float, strict: bool, show_all: bool, disable_trend: bool, disable_confirmation: bool) -> List[Dict]:
+    """candles is a CANDLE_DTYPE array whose first n_warm rows are warmup bars (see load_warmup_and_day_array)."""
     if disable_trend:
         settings.INTRADAY_ENABLE_TREND_CONFIRMATION = False
     if disable_confirmation:
         settings.INTRADAY_ENABLE_SIGNAL_CONFIRMATION = True
     ema = EMAState(symbol, timeframe, settings.INTRADAY_EMA_SHORT, settings.INTRADAY_EMA_LONG)
-    for b in warm:
-        ema.update_with_close(b['close'])
+    ema.warmup_from_array(candles['close'][:n_warm])
     harness = Harness(symbol, instrument_key, timeframe, getattr(settings, 'INTRADAY_CONFIRM_TIMEFRAME', '15m'))
     strategy = harness.strategy
-    bar_count = 0
+    signals = harness.executor.signals
+    day = candles[n_warm:]
+    if not len(day):
+        return []
+    closes = day['close'].astype(np.float64)
+    start_short = np.nan if ema.short_ema is None else ema.short_ema
+    start_long = np.nan if ema.long_ema is None else ema.long_ema
+    curr_s, curr_l = ema.stream_from_array(closes)
+    # EMA before each bar: the warmup state for the first bar, then the previous bar's value (NaN = not yet seeded)
+    prev_s = np.concatenate(([start_short], curr_s[:-1]))
+    prev_l = np.concatenate(([start_long], curr_l[:-1]))
+    valid = ~(np.isnan(prev_s) | np.isnan(prev_l))
+    thr = closes * threshold_pct if threshold_pct else np.zeros_like(closes)
+    if strict:
+        buy = (prev_s <= prev_l - thr) & (curr_s > curr_l + thr)
+        sell = (prev_s >= prev_l + thr) & (curr_s < curr_l - thr)
+    else:
+        buy = (prev_s <= prev_l) & (curr_s > curr_l)
+        sell = (prev_s >= prev_l) & (curr_s < curr_l)
+    buy &= valid
+    sell &= valid
+    # Bars numbered from 1 across the whole day; the first five never reach the strategy
+    skipped = np.arange(1, len(day) + 1) <= 5
+    include = (valid if show_all else (buy | sell))
     rows_out: List[Dict] = []
-    for b in day_rows:
-        ema.update_with_close(b['close'])
-        bar_count += 1
-        prev_short = ema.prev_short
-        prev_long = ema.prev_long
-        curr_short = ema.short_ema
-        curr_long = ema.long_ema
-        if prev_short is None or prev_long is None:
-            continue
-        thr = b['close'] * threshold_pct if threshold_pct else 0.0
-        simple_buy = prev_short <= prev_long and curr_short > curr_long
-        simple_sell = prev_short >= prev_long and curr_short < curr_long
-        strict_buy = prev_short <= (prev_long - thr) and curr_short > (curr_long + thr)
-        strict_sell = prev_short >= (prev_long + thr) and curr_short < (curr_long - thr)
-        detected_buy = strict_buy if strict else simple_buy
-        detected_sell = strict_sell if strict else simple_sell
-        class _Bar: pass
-        bar_obj = _Bar()
-        bar_obj.close = b['close']
-        bar_obj.ts = str(b['ts'])
-        skipped_warmup = bar_count <= 5
+    ts_col = day['ts']
+    # Only included bars (crossovers, or every seeded bar with --show-all) are visited in Python
+    for i in np.flatnonzero(include).tolist():
+        close = float(closes[i])
+        ps, pl, cs, cl = float(prev_s[i]), float(prev_l[i]), float(curr_s[i]), float(curr_l[i])
+        detected_buy, detected_sell = bool(buy[i]), bool(sell[i])
+        ts = str(ts_col[i])
         signal_generated = False
         signal_side = None
-        if not skipped_warmup and (detected_buy or detected_sell):
-            pre_count = len(harness.executor.signals)
+        if not skipped[i] and (detected_buy or detected_sell):
+            ema.prev_short, ema.prev_long, ema.short_ema, ema.long_ema = ps, pl, cs, cl
+            pre_count = len(signals)
             try:
-                await strategy.on_bar_close(symbol, instrument_key, timeframe, bar_obj, ema, None)
+                await strategy.on_bar_close(symbol, instrument_key, timeframe, _Bar(close, ts), ema, None)
             except Exception:
                 pass
-            post_count = len(harness.executor.signals)
-            if post_count > pre_count:
+            if len(signals) > pre_count:
                 signal_generated = True
-                last_sig = harness.executor.signals[-1]
+                last_sig = signals[-1]
                 signal_side = getattr(last_sig, 'side', getattr(last_sig, 'underlying_side', ''))
-        include = show_all or detected_buy or detected_sell
-        if include:
-            rows_out.append({
-                'ts': str(b['ts']),
-                'price': b['close'],
-                'prev_short': prev_short,
-                'prev_long': prev_long,
-                'curr_short': curr_short,
-                'curr_long': curr_long,
-                'prev_diff': prev_short - prev_long,
-                'curr_diff': curr_short - curr_long,
-                'threshold': thr,
-                'detected_buy': int(detected_buy),
-                'detected_sell': int(detected_sell),
-                'strict_mode': int(strict),
-                'skipped_warmup': int(skipped_warmup),
-                'signal_generated': int(signal_generated),
-                'signal_side': signal_side or ''
-            })
+        rows_out.append({
+            'ts': ts,
+            'price': close,
+            'prev_short': ps,
+            'prev_long': pl,
+            'curr_short': cs,
+            'curr_long': cl,
+            'prev_diff': ps - pl,
+            'curr_diff': cs - cl,
+            'threshold': float(thr[i]),
+            'detected_buy': int(detected_buy),
+            'detected_sell': int(detected_sell),
+            'strict_mode': int(strict),
+            'skipped_warmup': int(skipped[i]),
+            'signal_generated': int(signal_generated),
+            'signal_side': signal_side or ''
+        })
     return rows_out
 
 # -------- Replay ---------
 
 async def replay(symbol: str, harness: Harness, warm: List[Dict], day_rows: List[Dict], disable_trend: bool, disable_confirmation: bool) -> List[Dict]:
-    for r in warm:
-        harness.ema_primary.update_with_close(r['close'])
-        if harness.ema_confirm:
-            harness.ema_confirm.update_with_close(r['close'])
+    warm_closes = np.fromiter((r['close'] for r in warm), dtype=np.float64, count=len(warm))
+    harness.ema_primary.warmup_from_array(warm_closes)
+    if harness.ema_confirm:
+        harness.ema_confirm.warmup_from_array(warm_closes)
     settings.INTRADAY_ENABLE_TREND_CONFIRMATION = not disable_trend
     settings.INTRADAY_ENABLE_SIGNAL_CONFIRMATION = not disable_confirmation
     events: List[Dict] = []
+    signals = harness.executor.signals
+    seen = len(signals)
+    last_ts = None
+    # Event shape per signal class, resolved from the first instance seen ('underlying', 'option' or None)
+    kinds: Dict[type, Optional[str]] = {}
     for r in day_rows:
         harness.ema_primary.update_with_close(r['close'])
         bar = Bar(ts=str(r['ts']), open=r['open'], high=r['high'], low=r['low'], close=r['close'], volume=r['volume'])
         await harness.strategy.on_bar_close(symbol, harness.instrument_key, harness.primary_tf, bar, harness.ema_primary, harness.ema_confirm)
-        if harness.executor.signals:
-            sig = harness.executor.signals[-1]
-            if hasattr(sig, 'ts') and (not events or events[-1]['ts'] != sig.ts):
+        if len(signals) == seen:
+            continue
+        seen = len(signals)
+        sig = signals[-1]
+        cls = type(sig)
+        kind = kinds.get(cls, '')
+        if kind == '':
+            kind = kinds[cls] = 'underlying' if hasattr(sig, 'ts') else 'option' if hasattr(sig, 'timestamp') else None
+        if kind == 'underlying':
+            if sig.ts != last_ts:
+                last_ts = sig.ts
                 events.append({
                     'ts': sig.ts,
                     'side': sig.side,
                     'price': sig.price,
-                    'stop_loss': getattr(sig, 'stop_loss', None),
-                    'target': getattr(sig, 'target', None),
+                    'stop_loss': sig.stop_loss,
+                    'target': sig.target,
                 })
-            elif hasattr(sig, 'timestamp') and (not events or events[-1]['ts'] != sig.timestamp):
+        elif kind == 'option':
+            if sig.timestamp != last_ts:
+                last_ts = sig.timestamp
                 events.append({
                     'ts': sig.timestamp,
                     'underlying_symbol': sig.underlying_symbol,
                     'side': sig.underlying_side,
                     'price': sig.premium_ltp,
-                    'stop_loss': getattr(sig, 'stop_loss_premium', None),
-                    'target': getattr(sig, 'target_premium', None),
+                    'stop_loss': sig.stop_loss_premium,
+                    'target': sig.target_premium,
                     'contract_symbol': sig.contract_symbol,
                     'lots': sig.suggested_size_lots,
                 })
@@ -312,37 +359,48 @@ class Trade:
     outcome: Optional[str] = None
     r_multiple: Optional[float] = None
 
+def _first_hit(mask: np.ndarray) -> Optional[int]:
+    """Index of the first True in mask, or None."""
+    if not mask.size:
+        return None
+    i = int(mask.argmax())
+    return i if mask[i] else None
+
 async def simulate_performance(day_rows: List[Dict], signals: List[Dict]) -> Dict:
     trades: List[Trade] = []
     for s in signals:
         if s.get('stop_loss') is None or s.get('target') is None:
             continue
         trades.append(Trade(side=s['side'], entry_ts=s['ts'], entry_price=s['price'], stop=s['stop_loss'], target=s['target']))
+    # Bar columns built once; each trade then scans its tail with vectorised comparisons
+    ts = [str(r['ts']) for r in day_rows]
+    ts_to_idx: Dict[str, int] = {}
+    for i, t in enumerate(ts):
+        ts_to_idx.setdefault(t, i)
+    highs = np.fromiter((r['high'] for r in day_rows), dtype=float, count=len(day_rows))
+    lows = np.fromiter((r['low'] for r in day_rows), dtype=float, count=len(day_rows))
     for trade in trades:
-        after = False
-        for r in day_rows:
-            if str(r['ts']) == trade.entry_ts:
-                after = True
-                continue
-            if not after:
-                continue
-            high = r['high']; low = r['low']
-            if trade.side == 'BUY':
-                if low <= trade.stop:
-                    trade.exit_ts = str(r['ts']); trade.exit_price = trade.stop; trade.outcome = 'LOSS'
-                    risk = trade.entry_price - trade.stop; trade.r_multiple = -1.0 if risk else 0.0; break
-                if high >= trade.target:
-                    trade.exit_ts = str(r['ts']); trade.exit_price = trade.target; trade.outcome = 'WIN'
-                    reward = trade.target - trade.entry_price; risk = trade.entry_price - trade.stop
-                    trade.r_multiple = reward / risk if risk else 0.0; break
-            else:
-                if high >= trade.stop:
-                    trade.exit_ts = str(r['ts']); trade.exit_price = trade.stop; trade.outcome = 'LOSS'
-                    risk = trade.stop - trade.entry_price; trade.r_multiple = -1.0 if risk else 0.0; break
-                if low <= trade.target:
-                    trade.exit_ts = str(r['ts']); trade.exit_price = trade.target; trade.outcome = 'WIN'
-                    reward = trade.entry_price - trade.target; risk = trade.stop - trade.entry_price
-                    trade.r_multiple = reward / risk if risk else 0.0; break
+        entry_idx = ts_to_idx.get(trade.entry_ts)
+        if entry_idx is None:
+            continue
+        start = entry_idx + 1
+        if trade.side == 'BUY':
+            stop_i = _first_hit(lows[start:] <= trade.stop)
+            target_i = _first_hit(highs[start:] >= trade.target)
+            risk = trade.entry_price - trade.stop
+            reward = trade.target - trade.entry_price
+        else:
+            stop_i = _first_hit(highs[start:] >= trade.stop)
+            target_i = _first_hit(lows[start:] <= trade.target)
+            risk = trade.stop - trade.entry_price
+            reward = trade.entry_price - trade.target
+        # Stop has priority when both levels are touched on the same bar
+        if stop_i is not None and (target_i is None or stop_i <= target_i):
+            trade.exit_ts = ts[start + stop_i]; trade.exit_price = trade.stop; trade.outcome = 'LOSS'
+            trade.r_multiple = -1.0 if risk else 0.0
+        elif target_i is not None:
+            trade.exit_ts = ts[start + target_i]; trade.exit_price = trade.target; trade.outcome = 'WIN'
+            trade.r_multiple = reward / risk if risk else 0.0
     closed = [t for t in trades if t.outcome]
     wins = [t for t in closed if t.outcome == 'WIN']
     losses = [t for t in closed if t.outcome == 'LOSS']
@@ -366,15 +424,13 @@ async def simulate_performance(day_rows: List[Dict], signals: List[Dict]) -> Dic
 async def main_async():
     args = parse_args()
     day = datetime.strptime(args.date, '%Y-%m-%d')
-    db = Database(settings.DATABASE_URL)
-    await db.connect()
+    db = await Database.get(settings.DATABASE_URL)
     if not args.instrument_key:
         instrument_key = autodetect_instrument_key(db, args.symbol, args.timeframe)
     else:
         instrument_key = args.instrument_key
-    warm, day_rows = load_warmup_and_day(db, args.symbol, instrument_key, args.timeframe, day, args.warmup_bars)
-    await db.disconnect()
-    if not day_rows:
+    candles, n_warm = load_warmup_and_day_array(db, args.symbol, instrument_key, args.timeframe, day, args.warmup_bars)
+    if len(candles) == n_warm:
         print('No candles for date'); return
 
     if args.mode == 'diagnose':
@@ -382,8 +438,8 @@ async def main_async():
             args.symbol,
             instrument_key,
             args.timeframe,
-            warm,
-            day_rows,
+            candles,
+            n_warm,
             threshold_pct=args.threshold_pct,
             strict=args.strict,
             show_all=args.show_all,
@@ -393,21 +449,25 @@ async def main_async():
         if not rows:
             print('No crossover detections.')
         else:
-            print(','.join(DIAGNOSE_HEADERS))
-            for r in rows:
-                print(','.join([
-                    r['ts'],
-                    f"{r['price']:.2f}", f"{r['prev_short']:.4f}", f"{r['prev_long']:.4f}",
-                    f"{r['curr_short']:.4f}", f"{r['curr_long']:.4f}",
-                    f"{r['prev_diff']:.4f}", f"{r['curr_diff']:.4f}",
-                    f"{r['threshold']:.4f}",
-                    str(r['detected_buy']), str(r['detected_sell']), str(r['strict_mode']), str(r['skipped_warmup']), str(r['signal_generated']), r['signal_side']
-                ]))
             if args.output:
+                # CSV requested: write the rows once instead of also echoing them to stdout
                 write_csv(args.output, DIAGNOSE_HEADERS, rows)
+                print(f'Wrote {len(rows)} diagnose rows to {args.output}')
+            else:
+                out_lines = [','.join(DIAGNOSE_HEADERS)]
+                out_lines.extend(
+                    f"{r['ts']},{r['price']:.2f},{r['prev_short']:.4f},{r['prev_long']:.4f},"
+                    f"{r['curr_short']:.4f},{r['curr_long']:.4f},{r['prev_diff']:.4f},{r['curr_diff']:.4f},"
+                    f"{r['threshold']:.4f},{r['detected_buy']},{r['detected_sell']},{r['strict_mode']},"
+                    f"{r['skipped_warmup']},{r['signal_generated']},{r['signal_side']}"
+                    for r in rows
+                )
+                sys.stdout.write('\n'.join(out_lines) + '\n')
         return
 
-    harness = Harness(args.symbol, instrument_key, args.timeframe, args.confirm_tf, warm + day_rows)
+    rows = rows_from_array(candles)
+    warm, day_rows = rows[:n_warm], rows[n_warm:]
+    harness = Harness(args.symbol, instrument_key, args.timeframe, args.confirm_tf, rows)
     signals = await replay(args.symbol, harness, warm, day_rows, args.disable_trend, args.disable_confirmation)
 
     if args.mode == 'replay':
@@ -436,6 +496,7 @@ async def main_async():
 
 
 def main():
+    atexit.register(Database.close_all)
     asyncio.run(main_async())
 
 if __name__ == '__main__':
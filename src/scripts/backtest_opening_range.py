@@ -26,6 +26,8 @@ from typing import List, Dict, Any, Optional
 import sys
 import logging
 
+import numpy as np
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
@@ -139,24 +141,34 @@ def simulate_performance(rows: List[Dict[str, Any]], signal: Dict[str, Any]) ->
     stop = entry_price * (0.997 if side == 'BUY' else 1.003)
     target = entry_price * (1.006 if side == 'BUY' else 0.994)
     res = PerfResult(side, entry_ts, entry_price, stop, target)
-    after = False
-    for r in rows:
-        if str(r['ts']) == entry_ts:
-            after = True
-            continue
-        if not after:
-            continue
-        high = r['high']; low = r['low']
-        if side == 'BUY':
-            if low <= stop:
-                res.exit_ts = str(r['ts']); res.exit_price = stop; res.outcome = 'LOSS'; res.r_multiple = -1.0; break
-            if high >= target:
-                res.exit_ts = str(r['ts']); res.exit_price = target; res.outcome = 'WIN'; res.r_multiple = (target-entry_price)/(entry_price-stop); break
-        else:
-            if high >= stop:
-                res.exit_ts = str(r['ts']); res.exit_price = stop; res.outcome = 'LOSS'; res.r_multiple = -1.0; break
-            if low <= target:
-                res.exit_ts = str(r['ts']); res.exit_price = target; res.outcome = 'WIN'; res.r_multiple = (entry_price-target)/(stop-entry_price); break
+    ts = [str(r['ts']) for r in rows]
+    try:
+        start = ts.index(entry_ts) + 1
+    except ValueError:
+        return res
+    n = len(rows) - start
+    if n <= 0:
+        return res
+    # Bars after entry as arrays; the first True in the combined mask is the first exit (stop wins ties)
+    highs = np.fromiter((r['high'] for r in rows[start:]), dtype=np.float64, count=n)
+    lows = np.fromiter((r['low'] for r in rows[start:]), dtype=np.float64, count=n)
+    if side == 'BUY':
+        loss_mask = lows <= stop
+        win_mask = highs >= target
+    else:
+        loss_mask = highs >= stop
+        win_mask = lows <= target
+    any_mask = loss_mask | win_mask
+    if not any_mask.any():
+        return res
+    idx = int(np.argmax(any_mask))
+    res.exit_ts = ts[start + idx]
+    if loss_mask[idx]:
+        res.exit_price = stop; res.outcome = 'LOSS'; res.r_multiple = -1.0
+    elif side == 'BUY':
+        res.exit_price = target; res.outcome = 'WIN'; res.r_multiple = (target-entry_price)/(entry_price-stop)
+    else:
+        res.exit_price = target; res.outcome = 'WIN'; res.r_multiple = (entry_price-target)/(stop-entry_price)
     return res
 
 # ------------- Main Replay Logic -------------
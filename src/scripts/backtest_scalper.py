@@ -34,6 +34,8 @@ from typing import List, Dict, Optional, Any
 import sys
 from pathlib import Path
 
+import numpy as np
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
@@ -171,10 +173,10 @@ async def enumerate_crossovers(rows: List[Dict], ema_state: EMAState) -> List[Di
 
 async def replay_strategy(symbol: str, harness: Harness, warm: List[Dict], day_rows: List[Dict], use_filters: bool) -> List[Dict]:
     # Seed EMAs
-    for r in warm:
-        harness.ema_primary.update_with_close(r['close'])
-        if harness.ema_confirm:
-            harness.ema_confirm.update_with_close(r['close'])  # naive seed same bars
+    warm_closes = np.fromiter((r['close'] for r in warm), dtype=np.float64, count=len(warm))
+    harness.ema_primary.warmup_from_array(warm_closes)
+    if harness.ema_confirm:
+        harness.ema_confirm.warmup_from_array(warm_closes)  # naive seed same bars
     settings.SCALP_ENABLE_TREND_CONFIRMATION = use_filters
     settings.SCALP_ENABLE_SIGNAL_CONFIRMATION = use_filters
     events: List[Dict] = []
@@ -216,8 +218,7 @@ async def diagnose_crossovers(symbol: str, instrument_key: str, timeframe: str,
     if disable_confirmation:
         settings.SCALP_ENABLE_SIGNAL_CONFIRMATION = False
     ema = EMAState(instrument_key, timeframe, settings.EMA_SHORT, settings.EMA_LONG)
-    for b in warm:
-        ema.update_with_close(b['close'])
+    ema.warmup_from_array(np.fromiter((b['close'] for b in warm), dtype=np.float64, count=len(warm)))
     harness = Harness(symbol, instrument_key, timeframe)
     strategy = harness.strategy
     bar_count = 0
@@ -298,28 +299,31 @@ async def simulate_performance(day_rows: List[Dict], signals: List[Dict]) -> Dic
         trades.append(Trade(
             side=s['side'], entry_ts=s['ts'], entry_price=s['price'], stop=s['stop_loss'], target=s['target']
         ))
+    # First bar index per timestamp string, built once instead of re-scanning from the open per trade
+    ts_strs = [str(r['ts']) for r in day_rows]
+    ts_index: Dict[str, int] = {}
+    for i, t in enumerate(ts_strs):
+        ts_index.setdefault(t, i)
     # Iterate bars after each trade entry to resolve
     for trade in trades:
-        after = False
-        for r in day_rows:
-            if str(r['ts']) == trade.entry_ts:
-                after = True
-                continue
-            if not after:
-                continue
+        entry_idx = ts_index.get(trade.entry_ts)
+        if entry_idx is None:
+            continue
+        for i in range(entry_idx + 1, len(day_rows)):
+            r = day_rows[i]
             high = r['high']
             low = r['low']
             if trade.side == 'BUY':
                 # Stop first then target assumption (conservative) if both inside bar
                 if low <= trade.stop:
-                    trade.exit_ts = str(r['ts'])
+                    trade.exit_ts = ts_strs[i]
                     trade.exit_price = trade.stop
                     trade.outcome = 'LOSS'
                     risk = trade.entry_price - trade.stop
                     trade.r_multiple = -1.0 if risk else 0.0
                     break
                 if high >= trade.target:
-                    trade.exit_ts = str(r['ts'])
+                    trade.exit_ts = ts_strs[i]
                     trade.exit_price = trade.target
                     trade.outcome = 'WIN'
                     reward = trade.target - trade.entry_price
@@ -328,14 +332,14 @@ async def simulate_performance(day_rows: List[Dict], signals: List[Dict]) -> Dic
                     break
             else:  # SELL
                 if high >= trade.stop:
-                    trade.exit_ts = str(r['ts'])
+                    trade.exit_ts = ts_strs[i]
                     trade.exit_price = trade.stop
                     trade.outcome = 'LOSS'
                     risk = trade.stop - trade.entry_price
                     trade.r_multiple = -1.0 if risk else 0.0
                     break
                 if low <= trade.target:
-                    trade.exit_ts = str(r['ts'])
+                    trade.exit_ts = ts_strs[i]
                     trade.exit_price = trade.target
                     trade.outcome = 'WIN'
                     reward = trade.entry_price - trade.target
@@ -378,8 +382,7 @@ async def main_async():
 
     if args.mode == 'crossover':
         ema_state = EMAState(instrument_key, args.timeframe, settings.EMA_SHORT, settings.EMA_LONG)
-        for r in warm:
-            ema_state.update_with_close(r['close'])
+        ema_state.warmup_from_array(np.fromiter((r['close'] for r in warm), dtype=np.float64, count=len(warm)))
         events = await enumerate_crossovers(day_rows, ema_state)
         print(','.join(CROSS_FIELDNAMES))
         for e in events:
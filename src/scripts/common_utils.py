@@ -8,6 +8,7 @@ Consolidates duplicated logic previously spread across:
 Provides:
   autodetect_instrument_key(db, symbol, timeframe) -> str
   load_warmup_and_day(db, symbol, instrument_key, timeframe, day, warmup) -> (warmup_rows, day_rows)
+  load_warmup_and_day_array(db, symbol, instrument_key, timeframe, day, warmup) -> (candles, n_warm)
   aggregate_timeframe(rows, target_minutes, source_minutes) -> List[Dict]
   write_csv(path, fieldnames, rows)
 
@@ -18,8 +19,10 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple, Sequence
 
+import numpy as np
 from sqlalchemy import text
 
+from src.models.candle_models import CANDLE_DTYPE
 from src.persistence.db import Database, candles as candles_table
 
 # ---------------------------------------------------------------------------
@@ -99,6 +102,54 @@ def load_warmup_and_day(
         day_rows = [dict(r._mapping) for r in res.fetchall()]
     return warmup_rows, day_rows
 
+_WARMUP_AND_DAY_QUERY = text(
+    """
+    SELECT ts, open, high, low, close, volume, 0 AS in_day FROM (
+        SELECT ts, open, high, low, close, volume
+        FROM candles
+        WHERE symbol=:symbol AND instrument_key=:ik AND timeframe=:tf AND ts < :start
+        ORDER BY ts DESC
+        LIMIT :lim
+    ) AS warm
+    UNION ALL
+    SELECT ts, open, high, low, close, volume, 1 AS in_day
+    FROM candles
+    WHERE symbol=:symbol AND instrument_key=:ik AND timeframe=:tf AND ts >= :start AND ts < :end
+    ORDER BY ts
+    """
+)
+
+def load_warmup_and_day_array(
+    db: Database,
+    symbol: str,
+    instrument_key: str,
+    timeframe: str,
+    day: datetime,
+    warmup: int,
+) -> Tuple[np.ndarray, int]:
+    """Like load_warmup_and_day, but one query straight into a CANDLE_DTYPE structured array.
+
+    Returns (candles, n_warm): candles[:n_warm] are the warmup bars and candles[n_warm:] the
+    trading day, chronologically ascending.
+    """
+    start = datetime(day.year, day.month, day.day)
+    end = start + timedelta(days=1)
+    with db.engine.connect() as conn:
+        rows = conn.execute(
+            _WARMUP_AND_DAY_QUERY,
+            {"symbol": symbol, "ik": instrument_key, "tf": timeframe, "start": start, "end": end, "lim": max(warmup, 0)},
+        ).fetchall()
+    candles = np.fromiter(
+        ((ts, o, h, l, c, v or 0) for ts, o, h, l, c, v, _ in rows), dtype=CANDLE_DTYPE, count=len(rows)
+    )
+    n_warm = sum(1 for r in rows if not r.in_day)
+    return candles, n_warm
+
+def rows_from_array(candles: np.ndarray) -> List[Dict]:
+    """Dict rows (ts, open, high, low, close, volume) for code paths that still take per-bar dicts."""
+    names = ('ts', 'open', 'high', 'low', 'close', 'volume')
+    return [dict(zip(names, vals)) for vals in zip(*(candles[n].tolist() for n in names))]
+
 # ---------------------------------------------------------------------------
 # Timeframe aggregation (e.g. 1m -> 5m) using pandas resample semantics.
 # ---------------------------------------------------------------------------
@@ -153,12 +204,13 @@ def write_csv(path: str, fieldnames: Sequence[str], rows: Sequence[Dict]):
     with open(path, 'w', newline='') as f:
         w = csv.DictWriter(f, fieldnames=fieldnames)
         w.writeheader()
-        for r in rows:
-            w.writerow(r)
+        w.writerows(rows)
 
 __all__ = [
     'autodetect_instrument_key',
     'load_warmup_and_day',
+    'load_warmup_and_day_array',
+    'rows_from_array',
     'aggregate_timeframe',
     'write_csv',
 ]
@@ -1,2 +1,33 @@
 -- Run once to create additional indexes if desired
-CREATE INDEX IF NOT EXISTS idx_candles_ts ON candles (ts);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_candles_ts ON candles (ts);
+-- Newest-first scans per series used by Database.load_candles (also created by metadata.create_all on new databases)
+CREATE INDEX IF NOT EXISTS ix_candles_sit_ts_desc ON candles (symbol, instrument_key, timeframe, ts DESC);
+
+-- Candle prices are stored as 4-byte REAL (new databases get this from metadata.create_all)
+ALTER TABLE candles
+    ALTER COLUMN open TYPE REAL,
+    ALTER COLUMN high TYPE REAL,
+    ALTER COLUMN low TYPE REAL,
+    ALTER COLUMN close TYPE REAL;
+
+-- Option trade reasoning is stored as a JSONB object; only for databases created while it was a
+-- ";"-joined "Key=value" string. "OI_rank=0.80;PCR=1.10" becomes {"oi_rank": 0.80, "pcr": 1.10},
+-- matching the keys new rows are written with (non-numeric values are kept as strings).
+-- ALTER ... USING can't take a subquery, so the converted values go through a staging column.
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'option_trades' AND column_name = 'reasoning') IN ('character varying', 'text') THEN
+        ALTER TABLE option_trades ADD COLUMN reasoning_json JSONB;
+        UPDATE option_trades SET reasoning_json = COALESCE((
+            SELECT jsonb_object_agg(
+                       lower(split_part(kv, '=', 1)),
+                       CASE WHEN split_part(kv, '=', 2) ~ '^-?[0-9]+(\.[0-9]+)?([eE][-+]?[0-9]+)?$'
+                            THEN to_jsonb(split_part(kv, '=', 2)::numeric)
+                            ELSE to_jsonb(split_part(kv, '=', 2)) END)
+            FROM unnest(string_to_array(reasoning, ';')) AS kv
+            WHERE kv LIKE '%=%'), '{}'::jsonb);
+        ALTER TABLE option_trades DROP COLUMN reasoning;
+        ALTER TABLE option_trades RENAME COLUMN reasoning_json TO reasoning;
+    END IF;
+END $$;
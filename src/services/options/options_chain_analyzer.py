@@ -1,6 +1,8 @@
 import statistics
 from typing import Dict, List
 
+import numpy as np
+
 from src.models.option_models import OptionContract, RankedStrike
 
 
@@ -28,6 +30,42 @@ def compute_chain_metrics(chain: List[OptionContract]) -> Dict[str, float]:
     }
 
 
+def compute_chain_metrics_arrays(arrays: Dict[str, np.ndarray]) -> Dict[str, float]:
+    """compute_chain_metrics over the provider's column arrays (see OptionsChainProvider.get_chain_arrays)."""
+    kind = arrays.get('kind')
+    if kind is None or not len(kind):
+        return {}
+    oi, iv, strike = arrays['oi'], arrays['iv'], arrays['strike']
+    is_call = kind == 'CALL'
+    is_put = kind == 'PUT'
+    total_call_oi = int(oi[is_call].sum())
+    total_put_oi = int(oi[is_put].sum())
+    pcr = (total_put_oi / total_call_oi) if total_call_oi else 0.0
+    ivs = iv[iv > 0]
+    iv_median = float(np.median(ivs)) if ivs.size else 0.0
+    iv_mean = float(ivs.mean()) if ivs.size else 0.0
+    skew = 0.0
+    atm_call_iv = _approx_atm_iv_arrays(strike[is_call], iv[is_call])
+    atm_put_iv = _approx_atm_iv_arrays(strike[is_put], iv[is_put])
+    if atm_call_iv is not None and atm_put_iv is not None:
+        skew = atm_call_iv - atm_put_iv
+    return {
+        'pcr': pcr,
+        'iv_median': iv_median,
+        'iv_mean': iv_mean,
+        'iv_skew': skew
+    }
+
+
+def _approx_atm_iv_arrays(strikes: np.ndarray, ivs: np.ndarray):
+    if not strikes.size:
+        return None
+    unique = np.unique(strikes)
+    mid = unique[len(unique)//2]
+    # First contract at the middle strike, as the stable sort in _approx_atm_iv picks
+    return float(ivs[np.argmax(strikes == mid)])
+
+
 def _approx_atm_iv(contracts: List[OptionContract]):
     if not contracts:
         return None
@@ -1,11 +1,14 @@
+import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from src.api.routes import trading_control
 from src.services.options.options_chain_analyzer import (compute_chain_metrics,
+                                                  compute_chain_metrics_arrays,
                                                   rank_strikes)
-from src.models.option_models import OptionSignal
+from src.models.option_models import OptionContract, OptionSignal, RankedStrike
 from src.providers.options_chain_provider import OptionsChainProvider
 from src.risk.option_position_sizing import compute_option_position
 from src.utils.time_utils import now_ist
@@ -28,57 +31,112 @@ class OptionsManager:
                  emit_callback):
         self.provider = chain_provider
         self.cfg = config
+        self.reload_config()
         self.emit_callback = emit_callback  # async function accepting OptionSignal
         self.last_trade_side: Optional[str] = None
-        self.last_trade_ts: Optional[datetime] = None
+        self.last_trade_ts: Optional[datetime] = None  # reporting only; cooldown uses the monotonic clock
+        self.last_trade_monotonic: Optional[float] = None
+        # (symbol, mode) -> (monotonic fetch time, chain, metrics, snapshot id); reused within the debounce window
+        self._chain_cache: Dict[Tuple[str, str], Tuple[float, List[OptionContract], Dict[str, float], int]] = {}
+        # (symbol, mode) -> (snapshot id, {ranking args -> ranked strikes}); dropped when a new snapshot is fetched
+        self._rank_cache: Dict[Tuple[str, str], Tuple[int, Dict[tuple, List[RankedStrike]]]] = {}
+        # Per-key locks so concurrent signals share a single in-flight chain fetch
+        self._chain_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def reload_config(self, config: Optional[Dict[str, Any]] = None):
+        """Parse config into typed attributes once; pass a new dict (or mutate self.cfg) and call again to apply changes."""
+        if config is not None:
+            self.cfg = config
+        cfg = self.cfg
+        self._enabled = bool(cfg.get('OPTION_ENABLE', False))
+        self._cooldown_sec = int(cfg.get('OPTION_COOLDOWN_SEC', 300))
+        self._debounce_scalper = int(cfg.get('OPTION_DEBOUNCE_SEC', 30))
+        self._debounce_intraday = int(cfg.get('OPTION_DEBOUNCE_INTRADAY_SEC', 60))
+        self._oi_min_percentile = int(cfg.get('OPTION_OI_MIN_PERCENTILE', 60))
+        self._spread_max_scalper = float(cfg.get('OPTION_SPREAD_MAX_PCT_SCALPER', 0.015))
+        self._spread_max_intraday = float(cfg.get('OPTION_SPREAD_MAX_PCT_INTRADAY', 0.025))
+        self._risk_cap = float(cfg.get('OPTION_RISK_CAP_PER_TRADE', 2500))
+        self._lot_size = int(cfg.get('OPTION_LOT_SIZE', 75))
 
     def _cooldown_active(self, side: str) -> bool:
-        cooldown = int(self.cfg.get('OPTION_COOLDOWN_SEC', 300))
-        if not self.last_trade_ts or not self.last_trade_side:
-            return False
-        if self.last_trade_side != side:
+        if self.last_trade_monotonic is None or self.last_trade_side != side:
             return False
-        delta = (now_ist() - self.last_trade_ts).total_seconds()
-        return delta < cooldown
+        return (time.monotonic() - self.last_trade_monotonic) < self._cooldown_sec
 
     def _get_mode_and_debounce(self, origin: str) -> tuple:
         mode = 'scalper' if origin == 'scalper' else 'intraday'
-        debounce = int(self.cfg.get('OPTION_DEBOUNCE_SEC', 30)) if mode == 'scalper' else int(self.cfg.get('OPTION_DEBOUNCE_INTRADAY_SEC', 60))
+        debounce = self._debounce_scalper if mode == 'scalper' else self._debounce_intraday
         return mode, debounce
 
-    async def _fetch_and_rank_options(self, symbol: str, side: str, price: float, mode: str):
-        chain = self.provider.fetch_option_chain()
-        metrics = compute_chain_metrics(chain)
+    async def _get_chain_and_metrics(self, symbol: str, mode: str, debounce: int):
+        """Return (chain, metrics, snapshot_id), reusing the cached snapshot while younger than debounce seconds.
+
+        snapshot_id is None when the fetched chain was empty and therefore not cached.
+        """
+        key = (symbol, mode)
+        lock = self._chain_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self._chain_cache.get(key)
+            if cached and (time.monotonic() - cached[0]) < debounce:
+                logger.debug("Reusing option chain for %s/%s (debounce %ss)", symbol, mode, debounce)
+                return cached[1], cached[2], cached[3]
+            chain = await self.provider.fetch_option_chain()
+            # The provider keeps the same snapshot column-wise; fall back to per-contract metrics without it
+            get_arrays = getattr(self.provider, 'get_chain_arrays', None)
+            metrics = compute_chain_metrics_arrays(get_arrays()) if get_arrays else compute_chain_metrics(chain)
+            if not chain:
+                return chain, metrics, None
+            snapshot_id = time.monotonic_ns()
+            self._chain_cache[key] = (time.monotonic(), chain, metrics, snapshot_id)
+            self._rank_cache.pop(key, None)
+            return chain, metrics, snapshot_id
+
+    async def _fetch_and_rank_options(self, symbol: str, side: str, price: float, mode: str, debounce: int):
+        chain, metrics, snapshot_id = await self._get_chain_and_metrics(symbol, mode, debounce)
+        iv_median = metrics.get('iv_median', 0.0)
+        # rank_strikes only sees the spot through its ATM strike, so key on that rather than the raw price
+        rank_key = (side, round(price / 50.0) * 50, self._oi_min_percentile, self._spread_max_scalper, self._spread_max_intraday)
+        ranks = None
+        if snapshot_id is not None:
+            cached_id, ranks = self._rank_cache.get((symbol, mode), (None, None))
+            if cached_id != snapshot_id:
+                ranks = {}
+                self._rank_cache[(symbol, mode)] = (snapshot_id, ranks)
+            if rank_key in ranks:
+                return ranks[rank_key], metrics
         ranked = rank_strikes(
             chain=chain,
             side=side,
             spot_price=price,
             mode=mode,
-            oi_min_percentile=int(self.cfg.get('OPTION_OI_MIN_PERCENTILE', 60)),
-            iv_median=metrics.get('iv_median', 0.0),
-            spread_max_pct_scalper=float(self.cfg.get('OPTION_SPREAD_MAX_PCT_SCALPER', 0.015)),
-            spread_max_pct_intraday=float(self.cfg.get('OPTION_SPREAD_MAX_PCT_INTRADAY', 0.025))
+            oi_min_percentile=self._oi_min_percentile,
+            iv_median=iv_median,
+            spread_max_pct_scalper=self._spread_max_scalper,
+            spread_max_pct_intraday=self._spread_max_intraday
         )
+        if ranks is not None:
+            ranks[rank_key] = ranked
         return ranked, metrics
 
     def _compute_position(self, top, side: str, mode: str):
         return compute_option_position(
             top.contract,
             side,
-            account_risk_cap=float(self.cfg.get('OPTION_RISK_CAP_PER_TRADE', 2500)),
-            lot_size=int(self.cfg.get('OPTION_LOT_SIZE', 75)),
+            account_risk_cap=self._risk_cap,
+            lot_size=self._lot_size,
             mode=mode
         )
 
     def _create_reasoning(self, top, metrics):
-        return [
-            f"OI_rank={top.components.get('oi_rank'):.2f}",
-            f"IV_quality={top.components.get('iv_quality'):.2f}",
-            f"Spread_pct={top.effective_spread_pct:.4f}",
-            f"Distance={top.distance_from_atm}",
-            f"OI_change={top.components.get('oi_change'):.2f}",
-            f"PCR={metrics.get('pcr',0):.2f}",
-        ]
+        # Raw numbers; formatting is left to whoever displays them
+        return {
+            'oi_rank': top.components.get('oi_rank'),
+            'iv_quality': top.components.get('iv_quality'),
+            'spread_pct': top.effective_spread_pct,
+            'distance': top.distance_from_atm,
+            'oi_change': top.components.get('oi_change'),
+            'pcr': metrics.get('pcr', 0),
+        }
 
     def _create_option_signal(self, symbol: str, side: str, top, pos, metrics, reasoning):
         return OptionSignal(
@@ -100,10 +158,12 @@ class OptionsManager:
     def _update_cooldown(self, side: str, timestamp: datetime):
         self.last_trade_side = side
         self.last_trade_ts = timestamp
+        self.last_trade_monotonic = time.monotonic()
 
     async def _emit_signal(self, signal):
         try:
-            await self.emit_callback(signal)
+            # Shield so a cancelled sibling in a batch does not abort an in-flight emit
+            await asyncio.shield(self.emit_callback(signal))
         except Exception:
             logger.exception("Emit callback failed for option signal")
 
@@ -114,7 +174,7 @@ class OptionsManager:
                                         timeframe: str,
                                         origin: str):
         logger.debug(f"Options manager received underlying signal: {symbol} {side} @ {price:.2f} from {origin}")
-        if not self.cfg.get('OPTION_ENABLE', False):
+        if not self._enabled:
             logger.debug("Options trading disabled, ignoring signal")
             return
         if self._cooldown_active(side):
@@ -122,7 +182,7 @@ class OptionsManager:
             return
         mode, debounce = self._get_mode_and_debounce(origin)
         logger.debug(f"Options mode: {mode}, debounce: {debounce}s")
-        ranked, metrics = await self._fetch_and_rank_options(symbol, side, price, mode)
+        ranked, metrics = await self._fetch_and_rank_options(symbol, side, price, mode, debounce)
         if not ranked:
             logger.info("No ranked option strikes for side=%s origin=%s", side, origin)
             return
@@ -131,7 +191,26 @@ class OptionsManager:
         if pos['lots'] <= 0:
             logger.info("Position sizing produced 0 lots; skipping option trade")
             return
+        # Re-check: a concurrent signal on the same side may have emitted while we awaited the chain
+        if self._cooldown_active(side):
+            logger.info("Options cooldown active for side=%s; skipping", side)
+            return
         reasoning = self._create_reasoning(top, metrics)
         opt_signal = self._create_option_signal(symbol, side, top, pos, metrics, reasoning)
         self._update_cooldown(side, opt_signal.timestamp)
         await self._emit_signal(opt_signal)
+
+    async def publish_underlying_signals_batch(self, signals: List[Dict[str, Any]]) -> List[Any]:
+        """Publish several underlying signals concurrently.
+
+        Each item holds publish_underlying_signal kwargs. Signals for the same (symbol, mode)
+        share one debounced chain fetch; a failing signal does not cancel its siblings.
+        """
+        results = await asyncio.gather(
+            *(self.publish_underlying_signal(**sig) for sig in signals),
+            return_exceptions=True
+        )
+        for sig, res in zip(signals, results):
+            if isinstance(res, Exception):
+                logger.error("Underlying signal failed for %s: %s", sig.get('symbol'), res)
+        return results
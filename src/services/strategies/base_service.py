@@ -11,6 +11,7 @@ from src.engine.ema import EMAState
 from src.execution.execution import Executor
 from src.services.options.options_manager import OptionsManager
 from src.persistence.db import Database
+from src.persistence.ema_state import EMAStatePersistence
 from src.providers.broker_rest import BrokerRest
 from src.providers.broker_ws import BrokerWS
 from src.providers.options_chain_provider import OptionsChainProvider
@@ -66,6 +67,8 @@ class ServiceBase:
         # EMA state maps (remain empty if EMA disabled)
         self.ema_primary: Dict[str, EMAState] = {} if enable_ema else {}
         self.ema_confirm: Dict[str, EMAState] = {} if enable_ema else {}
+        # One instance so its last-written cache skips unchanged values across saves
+        self.ema_persistence = EMAStatePersistence(self.db)
 
         self.symbol_to_key: Dict[str, str] = {}
         self.executor = Executor(self.rest, self.db)
@@ -86,6 +89,16 @@ class ServiceBase:
             instrument_input = "nifty"
         instruments = resolve_instruments(instrument_input)
         logger.info("Resolved instruments: %s", [i['symbol'] for i in instruments])
+        # Warmup history: stored candles first, then one concurrent REST batch for instruments with none
+        stored_primary: Dict[str, List[dict]] = {}
+        fetched_primary: Dict[str, List[dict]] = {}
+        if self.enable_ema and self.warmup_bars > 0:
+            for inst in instruments:
+                stored_primary[inst['instrument_key']] = await self.db.load_candles(
+                    inst['symbol'], inst['instrument_key'], self.primary_tf, limit=self.warmup_bars)
+            missing = [k for k, rows in stored_primary.items() if not rows]
+            if missing:
+                fetched_primary = await self.rest.fetch_historical_batch(missing, self.primary_tf, limit=self.warmup_bars)
         for inst in instruments:
             symbol = inst['symbol']
             key = inst['instrument_key']
@@ -102,9 +115,9 @@ class ServiceBase:
             self.symbol_to_key[symbol] = key
             candles_primary: List[dict] = []
             if self.enable_ema and self.warmup_bars > 0:
-                candles_primary = await self.db.load_candles(symbol, key, self.primary_tf, limit=self.warmup_bars)
+                candles_primary = stored_primary.get(key)
                 if not candles_primary:
-                    candles_primary = await self.rest.fetch_historical(key, self.primary_tf, limit=self.warmup_bars)
+                    candles_primary = fetched_primary.get(key) or []
                     if candles_primary:
                         for idx, ic in enumerate(candles_primary):
                             candles_primary[idx] = {
@@ -161,8 +174,14 @@ class ServiceBase:
                     except Exception as e:
                         logger.warning("Confirm aggregation failed for %s: %s", symbol, e)
             if self.enable_ema:
-                ema_p = EMAState(key, self.primary_tf, self.short_period, self.long_period)
-                ema_p.initialize_from_candles(candles_primary)
+                ema_p = None
+                if not candles_primary:
+                    # No bars to warm up from: resume from the EMA values saved at the last stop
+                    ema_p = await self.ema_persistence.load_ema_state(
+                        symbol, self.primary_tf, self.short_period, self.long_period, instrument_key=key)
+                if ema_p is None:
+                    ema_p = EMAState(key, self.primary_tf, self.short_period, self.long_period)
+                    ema_p.initialize_from_candles(candles_primary)
                 self.ema_primary[symbol] = ema_p
                 if self.confirm_tf != self.primary_tf:
                     ema_c = EMAState(key, self.confirm_tf, self.short_period, self.long_period)
@@ -200,15 +219,11 @@ class ServiceBase:
             return
         await self.ws.disconnect()
         if self.enable_ema:
-            for symbol, state in self.ema_primary.items():
-                key = self.symbol_to_key.get(symbol, symbol)
-                await self.db.upsert_ema_state(symbol, key, self.primary_tf, state.short_period, state.short_ema)
-                await self.db.upsert_ema_state(symbol, key, self.primary_tf, state.long_period, state.long_ema)
+            # Every EMA value goes out in one bulk upsert, skipping ones unchanged since the last save
+            ema_maps = [self.ema_primary]
             if self.confirm_tf != self.primary_tf:
-                for symbol, state in self.ema_confirm.items():
-                    key = self.symbol_to_key.get(symbol, symbol)
-                    await self.db.upsert_ema_state(symbol, key, self.confirm_tf, state.short_period, state.short_ema)
-                    await self.db.upsert_ema_state(symbol, key, self.confirm_tf, state.long_period, state.long_ema)
+                ema_maps.append(self.ema_confirm)
+            await self.ema_persistence.save_all_states(*ema_maps)
         await self.db.disconnect()
         self._running = False
         logger.info("Service stopped")
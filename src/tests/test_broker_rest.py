@@ -0,0 +1,242 @@
+import pytest
+
+from src.providers.broker_rest import _candles_to_frame
+
+
+def test_candles_to_frame_typed_columns():
+    raw = [
+        ["2025-01-01T09:15:00+05:30", "100", 101, 99.5, 100.5, 1200, 0],
+        ["2025-01-01T09:16:00+05:30", 100.5, 102, 100, 101.5, 900, 0],
+    ]
+    rows = _candles_to_frame(raw).to_dict("records")
+    assert rows[0] == {"ts": "2025-01-01T09:15:00+05:30", "open": 100.0, "high": 101.0,
+                       "low": 99.5, "close": 100.5, "volume": 1200}
+    assert isinstance(rows[1]["volume"], int)
+
+
+def test_candles_to_frame_missing_volume_defaults_to_zero():
+    rows = _candles_to_frame([["a", 1, 2, 0.5, 1.5]]).to_dict("records")
+    assert rows[0]["volume"] == 0
+    assert _candles_to_frame([]).empty
+
+
+class _FakeOptionsApi:
+    def __init__(self, expiries):
+        self.calls = 0
+        self.expiries = expiries
+
+    def get_option_contracts(self, instrument_key):
+        from types import SimpleNamespace
+        self.calls += 1
+        data = [SimpleNamespace(expiry=e, strike_price=24000, instrument_type='CE',
+                                trading_symbol=None, instrument_key='NSE_FO|1') for e in self.expiries]
+        return SimpleNamespace(data=data)
+
+
+def test_nearest_expiry_fetches_contracts_once_per_day():
+    from datetime import date, timedelta
+
+    from src.providers.broker_rest import BrokerRest
+    rest = BrokerRest("key", "secret", "token")
+    today = date.today()
+    rest.options_api = _FakeOptionsApi([today + timedelta(days=9), today + timedelta(days=2)])
+    first = rest.find_nearest_expiry("NSE_INDEX|Nifty 50")
+    assert first == (today + timedelta(days=2)).strftime('%Y-%m-%d')
+    assert rest.find_nearest_expiry("NSE_INDEX|Nifty 50") == first
+    assert len(rest.get_option_contracts("NSE_INDEX|Nifty 50")) == 2
+    assert rest.options_api.calls == 1
+
+
+def test_parse_expiry_accepts_iso_and_free_form_strings():
+    from datetime import date, datetime
+
+    from src.providers.broker_rest import _parse_expiry
+    assert _parse_expiry("2025-01-30") == date(2025, 1, 30)
+    assert _parse_expiry("30 Jan 2025") == date(2025, 1, 30)
+    assert _parse_expiry(datetime(2025, 1, 30, 15, 30)) == date(2025, 1, 30)
+    assert _parse_expiry(None) is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_historical_batch_bounds_concurrency():
+    import asyncio
+
+    from src.providers.broker_rest import BrokerRest
+    rest = BrokerRest("key", "secret", "token")
+    in_flight = {"now": 0, "max": 0}
+
+    async def fake_fetch(symbol, timeframe="1m", limit=375):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        if symbol == "BAD":
+            raise RuntimeError("boom")
+        return [{"ts": symbol}]
+
+    rest.fetch_historical = fake_fetch
+    out = await rest.fetch_historical_batch(["A", "B", "C", "BAD", "D"], concurrency=2)
+    assert in_flight["max"] == 2
+    assert out["A"] == [{"ts": "A"}]
+    assert out["BAD"] == []
+    assert list(out) == ["A", "B", "C", "BAD", "D"]
+
+
+def test_date_windows_split_long_ranges():
+    from src.providers.broker_rest import _date_windows
+    assert _date_windows("2025-01-01", "2025-01-10") == [("2025-01-01", "2025-01-10")]
+    windows = _date_windows("2025-01-01", "2025-03-05")
+    assert windows[0] == ("2025-01-01", "2025-01-30")
+    assert windows[1][0] == "2025-01-31"
+    assert windows[-1][1] == "2025-03-05"
+
+
+def _chain_item(strike, expiry, call_delta=0.5):
+    from types import SimpleNamespace as NS
+    greeks = lambda iv, delta: NS(iv=iv, delta=delta, gamma=0.01, theta=-5.0, vega=2.0)
+    return NS(
+        strike_price=strike,
+        expiry=expiry,
+        call_options=NS(instrument_key=f"NSE_FO|C{strike}", market_data=NS(oi=1000, ltp=120.5, bid_price=120.0, ask_price=121.0),
+                        option_greeks=greeks(15.0, call_delta)),
+        put_options=NS(instrument_key=f"NSE_FO|P{strike}", market_data=None, option_greeks=None),
+    )
+
+
+@pytest.mark.asyncio
+async def test_option_chain_rows_from_typed_frame():
+    from datetime import date, timedelta
+    from types import SimpleNamespace as NS
+
+    from src.providers.broker_rest import BrokerRest
+    rest = BrokerRest("key", "secret", "token")
+    expiry = date.today() + timedelta(days=3)
+    api = _FakeOptionsApi([expiry])
+    api.get_put_call_option_chain = lambda key, exp: NS(data=[_chain_item(24000.0, expiry), _chain_item(24050.0, None, call_delta=None)])
+    rest.options_api = api
+    chain = await rest.get_option_chain("NSE_INDEX|Nifty 50")
+    assert len(chain) == 2
+    assert chain[0] == {"symbol": "NSE_FO|C24000.0", "strike": 24000.0, "type": "CALL", "expiry": expiry.strftime('%Y-%m-%d'),
+                        "oi": 1000, "iv": 15.0, "ltp": 120.5, "bid": 120.0, "ask": 121.0,
+                        "delta": 0.5, "gamma": 0.01, "theta": -5.0, "vega": 2.0}
+    assert chain[1]["delta"] is None
+    assert rest.get_option_chain_df("NSE_INDEX|Nifty 50")["oi"].dtype == "int64"
+
+
+@pytest.mark.asyncio
+async def test_fetch_historical_array_matches_records():
+    from types import SimpleNamespace as NS
+
+    from src.providers.broker_rest import BrokerRest
+    rest = BrokerRest("key", "secret", access_token=None, cache_dir=None)  # no token: SDK path
+    raw = [["2025-01-02T09:15:00+05:30", 10, 11, 9, 10.5, 100], ["2025-01-01T09:15:00+05:30", 9, 10, 8, 9.5, 50]]
+    rest.historical_api = NS(get_historical_candle_data1=lambda *a: NS(data=NS(candles=raw)))
+    arr = await rest.fetch_historical_array("NSE_EQ|X", "1d", 2)
+    records = await rest.fetch_historical("NSE_EQ|X", "1d", 2)
+    assert arr.dtype.names == ("ts", "open", "high", "low", "close", "volume")
+    assert arr["close"].tolist() == [r["close"] for r in records] == [10.5, 9.5]
+    assert arr["ts"][0] == records[0]["ts"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_historical_uses_async_http_with_token():
+    import httpx
+
+    from src.providers.broker_rest import BrokerRest
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={"status": "success", "data": {"candles": [["2025-01-02T09:15:00+05:30", 1, 2, 0.5, 1.5, 10]]}})
+
+    rest = BrokerRest("key", "secret", "token", cache_dir=None)
+    rest._http = httpx.AsyncClient(base_url="https://api.upstox.com", transport=httpx.MockTransport(handler),
+                                   headers={"Authorization": "Bearer token"})
+    candles = await rest.fetch_historical("NSE_INDEX|Nifty 50", "1d", 1)
+    await rest.close()
+    assert candles == [{"ts": "2025-01-02T09:15:00+05:30", "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10}]
+    assert seen[0].url.raw_path.startswith(b"/v3/historical-candle/NSE_INDEX%7CNifty%2050/days/1/")
+    assert seen[0].headers["Authorization"] == "Bearer token"
+
+
+@pytest.mark.asyncio
+async def test_ping_reuses_recent_success():
+    from types import SimpleNamespace as NS
+
+    from src.providers.broker_rest import BrokerRest
+    rest = BrokerRest("key", "secret", "token")
+    calls = []
+    rest.login_api = NS(get_profile=lambda: calls.append(1) or NS(data=NS(user_name="u")))
+    assert await rest.ping() and await rest.ping()
+    assert len(calls) == 1
+    rest._last_ping_ts -= 60
+    assert await rest.ping()
+    assert len(calls) == 2
+
+
+def test_candle_to_dict_matches_frame_records():
+    from src.providers.broker_rest import _candle_to_dict, _candles_to_frame
+    rows = [["2025-01-01T09:15:00+05:30", "1", 2, 0.5, 1.5, 10], ["2025-01-01T09:16:00+05:30", 1.5, 2, 1, 1.75, 0]]
+    assert list(map(_candle_to_dict, rows)) == _candles_to_frame(rows).to_dict("records")
+    assert _candle_to_dict(["t", 1, 1, 1, 1])["volume"] == 0
+
+
+@pytest.mark.asyncio
+async def test_past_windows_are_served_from_disk_cache(tmp_path):
+    from datetime import datetime
+    from types import SimpleNamespace as NS
+
+    from src.providers.broker_rest import BrokerRest
+    from src.utils.time_utils import IST
+    calls = []
+
+    def fake_history(symbol, unit, interval, to_s, from_s):
+        calls.append((from_s, to_s))
+        return NS(data=NS(candles=[[f"{to_s}T09:15:00+05:30", 1, 2, 0.5, 1.5, 10]]))
+
+    rests = [BrokerRest("key", "secret", access_token=None, cache_dir=str(tmp_path)) for _ in range(2)]
+    for rest in rests:
+        rest.historical_api = NS(get_historical_candle_data1=fake_history)
+    past = await rests[0]._historical_candles("NSE_EQ|X", "days", 1, "2024-01-31", "2024-01-01")
+    assert await rests[1]._historical_candles("NSE_EQ|X", "days", 1, "2024-01-31", "2024-01-01") == past
+    assert calls == [("2024-01-01", "2024-01-31")]
+    # Windows reaching today are always refetched
+    today = datetime.now(IST).strftime("%Y-%m-%d")
+    await rests[0]._historical_candles("NSE_EQ|X", "days", 1, today, today)
+    await rests[1]._historical_candles("NSE_EQ|X", "days", 1, today, today)
+    assert len(calls) == 3
+
+
+def test_synthetic_chain_rows():
+    from src.providers.broker_rest import _synthetic_chain
+    chain = _synthetic_chain("nifty", 24010.0, "2025-01-30")
+    assert [(r['strike'], r['type']) for r in chain] == [(23950, "CALL"), (23950, "PUT"), (24000, "CALL"),
+                                                          (24000, "PUT"), (24050, "CALL"), (24050, "PUT")]
+    assert chain[0] == {'symbol': "NIFTY_OPT_23950CE", 'strike': 23950, 'type': "CALL", 'expiry': "2025-01-30",
+                        'oi': 90000, 'iv': 11.95, 'ltp': 30.0, 'bid': 29.5, 'ask': 30.5}
+    assert chain[3]['oi'] == 95000 and chain[3]['ltp'] == 9.0
+    assert chain[5]['oi'] == 86000 and chain[5]['iv'] == 12.05
+    assert _synthetic_chain("nifty", 0.0, "2025-01-30") == []
+
+
+@pytest.mark.asyncio
+async def test_intraday_and_date_range_use_async_http():
+    from datetime import datetime
+
+    import httpx
+
+    from src.providers.broker_rest import BrokerRest
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.raw_path.decode())
+        return httpx.Response(200, json={"data": {"candles": [["2025-01-02T09:15:00+05:30", 1, 2, 0.5, 1.5, 10]]}})
+
+    rest = BrokerRest("key", "secret", "token", cache_dir=None)
+    rest._http = httpx.AsyncClient(base_url="https://api.upstox.com", transport=httpx.MockTransport(handler))
+    intraday = await rest.fetch_intraday("NSE_EQ|X", "5m")
+    ranged = await rest.fetch_historical_date_range("NSE_EQ|X", "1m", datetime(2025, 1, 1), datetime(2025, 1, 2))
+    await rest.close()
+    assert intraday == ranged and intraday[0]["close"] == 1.5
+    assert paths == ["/v3/historical-candle/intraday/NSE_EQ%7CX/minutes/5",
+                     "/v3/historical-candle/NSE_EQ%7CX/minutes/1/2025-01-02/2025-01-01"]
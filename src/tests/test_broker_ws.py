@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_protobuf_and_dict_messages_produce_same_tick():
+    from google.protobuf.json_format import MessageToDict
+    from upstox_client.feeder.proto import MarketDataFeedV3_pb2 as pb
+
+    from src.providers.broker_ws import BrokerWS
+    ws = BrokerWS("token")
+    ws.instrument_to_symbol = {"NSE_INDEX|Nifty 50": "NIFTY"}
+    ticks = []
+
+    async def on_tick(tick):
+        ticks.append(tick)
+
+    ws.on_tick = on_tick
+    ws._loop = asyncio.get_running_loop()
+    msg = pb.FeedResponse()
+    msg.feeds["NSE_INDEX|Nifty 50"].ltpc.ltp = 24012.5
+    msg.feeds["NSE_INDEX|Nifty 50"].ltpc.ltt = 1736395200000
+    msg.feeds["NSE_FO|123"].ltpc.ltp = 101.0
+    msg.feeds["NSE_FO|123"].ltpc.ltt = 1736395260000
+    ws._process_message(msg)
+    ws._process_message(MessageToDict(msg))
+    await asyncio.sleep(0.05)
+    assert len(ticks) == 4
+    assert ticks[:2] == ticks[2:]
+    nifty = next(t for t in ticks if t["instrument_key"] == "NSE_INDEX|Nifty 50")
+    assert (nifty["symbol"], nifty["price"], nifty["volume"]) == ("NIFTY", 24012.5, 1)
+    assert nifty["ts"].startswith("2025-01-09")
+    assert {t["symbol"] for t in ticks} == {"NIFTY", "123"}
+
+
+@pytest.mark.asyncio
+async def test_batched_ticks_are_delivered_in_order_from_another_thread():
+    import threading
+
+    from src.providers.broker_ws import BrokerWS
+    ws = BrokerWS("token")
+    batches = []
+
+    async def on_tick_batch(batch):
+        batches.append([t["price"] for t in batch])
+
+    ws.on_tick_batch = on_tick_batch
+    await ws.connect()
+    messages = [{"feeds": {f"NSE_EQ|S{i}": {"ltpc": {"ltp": float(i), "ltt": "1736395200000"}}}} for i in range(50)]
+    worker = threading.Thread(target=lambda: [ws._process_message(m) for m in messages])
+    worker.start()
+    worker.join()
+    await asyncio.sleep(0.05)
+    await ws.disconnect()
+    assert [p for batch in batches for p in batch] == [float(i) for i in range(50)]
+    assert ws._consumer is None
+
+
+@pytest.mark.asyncio
+async def test_queued_on_tick_callbacks_run_concurrently():
+    from src.providers.broker_ws import BrokerWS
+    ws = BrokerWS("token")
+    release = asyncio.Event()
+    seen = []
+
+    async def on_tick(tick):
+        seen.append(tick["price"])
+        if tick["price"] == 0.0:
+            await release.wait()  # a slow callback must not hold up the ticks queued behind it
+
+    ws.on_tick = on_tick
+    await ws.connect()
+    for i in range(3):
+        ws._process_message({"feeds": {f"NSE_EQ|S{i}": {"ltpc": {"ltp": float(i), "ltt": "1736395200000"}}}})
+    await asyncio.sleep(0.05)
+    assert seen == [0.0, 1.0, 2.0]
+    release.set()
+    await asyncio.sleep(0)
+    await ws.disconnect()
+
+
+def test_resubscribe_sends_only_the_difference():
+    from src.providers.broker_ws import BrokerWS
+    calls = []
+
+    class FakeStreamer:
+        def subscribe(self, keys, mode):
+            calls.append(("sub", keys, mode))
+
+        def unsubscribe(self, keys):
+            calls.append(("unsub", keys))
+
+    ws = BrokerWS("token")
+    ws.streamer = FakeStreamer()
+    ws._subscribed = {"A", "B"}
+    assert ws._resubscribe(["B", "C"])
+    assert calls == [("unsub", ["A"]), ("sub", ["C"], "ltpc")]
+    assert ws._subscribed == {"B", "C"}
+
+    def closed(keys, mode):
+        raise Exception("WebSocket is not open.")
+
+    ws.streamer.subscribe = closed
+    assert not ws._resubscribe(["D"]) and ws._subscribed == {"B", "C"}
@@ -0,0 +1,178 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.engine.ema import EMAState
+from src.persistence import db as db_module
+from src.persistence.db import Database
+from src.persistence.ema_state import EMAStatePersistence
+
+_T0 = datetime(2024, 1, 2, 9, 15, tzinfo=timezone.utc)
+
+
+def _bar(i, close=100.0):
+    return SimpleNamespace(ts=_T0 + timedelta(minutes=i), open=close, high=close + 1, low=close - 1, close=close, volume=10)
+
+
+async def _connected(tmp_path, name="candles.db"):
+    db = Database(f"sqlite:///{tmp_path / name}")
+    await db.connect()
+    return db
+
+
+async def _stored_closes(db, timeframe="1m", limit=50):
+    return [c["close"] for c in await db.load_candles("NIFTY", "NSE_INDEX|Nifty 50", timeframe, limit=limit)]
+
+
+@pytest.mark.asyncio
+async def test_pending_candles_flush_on_interval(tmp_path):
+    db = await _connected(tmp_path)
+    await db.persist_candle("NIFTY", "NSE_INDEX|Nifty 50", "1m", _bar(0, 101.0))
+    await db.persist_candle("NIFTY", "NSE_INDEX|Nifty 50", "1m", _bar(1, 102.0))
+    # Dict bars (as built by the aggregation paths) go through the same buffer
+    await db.persist_candle("NIFTY", "NSE_INDEX|Nifty 50", "5m", {"ts": _T0 + timedelta(minutes=5), "open": 103.0,
+                                                                  "high": 104.0, "low": 102.0, "close": 103.0, "volume": 5})
+    assert len(db._pending) == 3
+    await asyncio.sleep(db_module._CANDLE_FLUSH_INTERVAL_SEC * 3)
+    assert db._pending == []
+    assert await _stored_closes(db) == [101.0, 102.0]
+    assert await _stored_closes(db, "5m") == [103.0]
+    await db.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_pending_candles_flush_when_buffer_fills(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_module, "_CANDLE_FLUSH_INTERVAL_SEC", 60)
+    monkeypatch.setattr(db_module, "_CANDLE_FLUSH_MAX_PENDING", 3)
+    db = await _connected(tmp_path)
+    for i in range(2):
+        await db.persist_candle("NIFTY", "NSE_INDEX|Nifty 50", "1m", _bar(i))
+    await asyncio.sleep(0.1)
+    assert len(db._pending) == 2
+    await db.persist_candle("NIFTY", "NSE_INDEX|Nifty 50", "1m", _bar(2))
+    await asyncio.sleep(0.1)
+    assert db._pending == []
+    assert len(await _stored_closes(db)) == 3
+    await db.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_flushes_pending_candles(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_module, "_CANDLE_FLUSH_INTERVAL_SEC", 60)
+    db = await _connected(tmp_path)
+    for i in range(2):
+        await db.persist_candle("NIFTY", "NSE_INDEX|Nifty 50", "1m", _bar(i))
+    await db.disconnect()
+    assert db._pending == [] and db._flush_task is None
+    await db.connect()
+    assert len(await _stored_closes(db)) == 2
+    await db.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_flush_requeues_unwritten_bars(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_module, "_CANDLE_FLUSH_INTERVAL_SEC", 60)
+    db = await _connected(tmp_path)
+    written = []
+    persist = db.persist_candles_bulk
+
+    async def slow_persist(symbol, instrument_key, timeframe, bars):
+        await asyncio.sleep(0.05)
+        await persist(symbol, instrument_key, timeframe, bars)
+        written.append(symbol)
+
+    db.persist_candles_bulk = slow_persist
+    for symbol in ("A", "B", "C"):
+        await db.persist_candle(symbol, f"NSE_EQ|{symbol}", "1m", _bar(0))
+    flush = asyncio.create_task(db.flush_candles())
+    await asyncio.sleep(0.07)
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+    assert written == ["A"]
+    assert [p[0] for p in db._pending] == ["B", "C"]
+    await db.disconnect()
+    assert written == ["A", "B", "C"] and db._pending == []
+
+
+@pytest.mark.asyncio
+async def test_flush_loop_survives_a_failed_flush(tmp_path):
+    db = await _connected(tmp_path)
+    persist = db.persist_candles_bulk
+    failures = []
+
+    async def flaky_persist(*args):
+        if not failures:
+            failures.append(args[0])
+            raise RuntimeError("boom")
+        await persist(*args)
+
+    db.persist_candles_bulk = flaky_persist
+    await db.persist_candle("NIFTY", "NSE_INDEX|Nifty 50", "1m", _bar(0))
+    await asyncio.sleep(db_module._CANDLE_FLUSH_INTERVAL_SEC * 4)
+    assert failures == ["NIFTY"] and not db._flush_task.done()
+    assert db._pending == []
+    assert len(await _stored_closes(db)) == 1
+    await db.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_ema_states_round_trip_and_skip_unchanged_values(tmp_path):
+    db = await _connected(tmp_path)
+    writes = []
+    upsert = db.upsert_ema_state_bulk
+
+    async def counting_upsert(rows):
+        writes.append([(r['period'], r['ema_value']) for r in rows])
+        return await upsert(rows)
+
+    db.upsert_ema_state_bulk = counting_upsert
+    persistence = EMAStatePersistence(db)
+    state = EMAState("NSE_INDEX|Nifty 50", "1m", 9, 21, short_ema=24010.5, long_ema=23990.25)
+    await persistence.save_all_states({"NIFTY": state})
+
+    loaded = await EMAStatePersistence(db).load_ema_state("NIFTY", "1m", 9, 21, instrument_key="NSE_INDEX|Nifty 50")
+    assert (loaded.symbol, loaded.short_ema, loaded.long_ema) == ("NSE_INDEX|Nifty 50", 24010.5, 23990.25)
+    assert await persistence.load_ema_state("NIFTY", "1m", 9, 50, instrument_key="NSE_INDEX|Nifty 50") is None
+
+    # Unchanged (within epsilon) values are skipped; only the moved period is written
+    state.short_ema += 1e-12
+    await persistence.save_all_states({"NIFTY": state})
+    state.long_ema = 23991.0
+    await persistence.save_all_states({"NIFTY": state})
+    assert writes == [[(9, 24010.5), (21, 23990.25)], [(21, 23991.0)]]
+    await db.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_load_candles_columnar_returns_chronological_float32_columns(tmp_path):
+    import numpy as np
+
+    db = await _connected(tmp_path)
+    bars = [{"ts": _T0 + timedelta(minutes=i), "open": 100.0 + i, "high": 101.0 + i, "low": 99.0 + i,
+             "close": 100.5 + i, "volume": None if i == 1 else 10 * (i + 1)} for i in range(3)]
+    await db.persist_candles_bulk("NIFTY", "NSE_INDEX|Nifty 50", "1m", bars[::-1])
+    cols = await db.load_candles_columnar("NIFTY", "NSE_INDEX|Nifty 50", "1m", limit=10)
+    assert len(cols) == 3
+    assert cols.close.tolist() == [100.5, 101.5, 102.5]
+    assert all(a.dtype == np.float32 for a in (cols.open, cols.high, cols.low, cols.close))
+    assert cols.volume.dtype == np.int64 and cols.volume.tolist() == [10, 0, 30]
+    empty = await db.load_candles_columnar("NIFTY", "NSE_INDEX|Nifty 50", "5m")
+    assert len(empty) == 0 and empty.close.dtype == np.float32
+    await db.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_load_candles_pages_backwards_before_ts(tmp_path):
+    db = await _connected(tmp_path)
+    await db.persist_candles_bulk("NIFTY", "NSE_INDEX|Nifty 50", "1m", [_bar(i, 100.0 + i) for i in range(6)])
+    page = await db.load_candles("NIFTY", "NSE_INDEX|Nifty 50", "1m", limit=2, before_ts=_T0 + timedelta(minutes=4))
+    assert [c["close"] for c in page] == [102.0, 103.0]
+    # Keyset paging: the next page ends strictly before the oldest bar of this one
+    older = await db.load_candles("NIFTY", "NSE_INDEX|Nifty 50", "1m", limit=2, before_ts=page[0]["ts"])
+    assert [c["close"] for c in older] == [100.0, 101.0]
+    cols = await db.load_candles_columnar("NIFTY", "NSE_INDEX|Nifty 50", "1m", limit=10, before_ts=_T0 + timedelta(minutes=2))
+    assert cols.close.tolist() == [100.0, 101.0]
+    await db.disconnect()
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from src.engine.ema import EMAState
+
+
+@pytest.mark.parametrize("n, seeded", [(1, False), (2, False), (500, False), (1, True), (300, True)])
+def test_warmup_from_array_matches_update_loop(n, seeded):
+    rng = np.random.default_rng(7)
+    closes = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    init = {"short_ema": 101.0, "long_ema": 99.0} if seeded else {}
+    looped = EMAState("T", "1m", 8, 21, **init)
+    for c in closes:
+        looped.update_with_close(float(c))
+    fast = EMAState("T", "1m", 8, 21, **init)
+    fast.warmup_from_array(closes)
+    for attr in ("short_ema", "long_ema", "prev_short", "prev_long"):
+        expected, got = getattr(looped, attr), getattr(fast, attr)
+        if expected is None:
+            assert got is None
+        else:
+            assert got == pytest.approx(expected, rel=1e-12)
+
+
+def test_warmup_from_array_empty_is_noop():
+    ema = EMAState("T", "1m", 8, 21)
+    ema.warmup_from_array(np.empty(0))
+    assert ema.short_ema is None and ema.prev_short is None
+
+
+def test_stream_from_array_returns_per_bar_values():
+    closes = [100.0, 101.5, 99.0, 102.25, 103.0]
+    looped = EMAState("T", "1m", 2, 3)
+    expected_short, expected_long = [], []
+    for c in closes:
+        looped.update_with_close(c)
+        expected_short.append(looped.short_ema)
+        expected_long.append(looped.long_ema)
+    streamed = EMAState("T", "1m", 2, 3)
+    short_arr, long_arr = streamed.stream_from_array(np.array(closes))
+    assert short_arr.tolist() == expected_short
+    assert long_arr.tolist() == expected_long
+    assert (streamed.prev_short, streamed.prev_long) == (looped.prev_short, looped.prev_long)
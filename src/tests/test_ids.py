@@ -0,0 +1,19 @@
+import time
+import uuid
+
+from src.utils.ids import uuid7, uuid7_str
+
+
+def test_uuid7_version_and_variant():
+    u = uuid7()
+    assert u.version == 7
+    assert u.variant == uuid.RFC_4122
+
+
+def test_uuid7_embeds_timestamp_and_sorts_by_time():
+    before = time.time_ns() // 1_000_000
+    first = uuid7()
+    time.sleep(0.002)
+    second = uuid7_str()
+    assert abs((first.int >> 80) - before) < 1000
+    assert str(first) < second
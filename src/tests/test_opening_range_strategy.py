@@ -22,7 +22,7 @@ class DummyOptionsProvider:
         self.instrument_symbol = "NIFTY"
     def set_instrument(self, sym):
         self.instrument_symbol = sym
-    def fetch_option_chain(self):
+    async def fetch_option_chain(self):
         return self.chains.pop(0) if self.chains else []
 
 class DummyOptionsManager:
@@ -0,0 +1,18 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.risk.option_position_sizing import (compute_option_position,
+                                             compute_option_positions)
+
+
+@pytest.mark.parametrize("mode", ["scalper", "intraday"])
+def test_batch_sizing_matches_scalar(mode):
+    contracts = [SimpleNamespace(ltp=p) for p in (120.0, 0.0, -5.0, 3.3, 250.75)]
+    batch = compute_option_positions(contracts, "BUY", account_risk_cap=5000, lot_size=75, mode=mode)
+    for i, c in enumerate(contracts):
+        one = compute_option_position(c, "BUY", account_risk_cap=5000, lot_size=75, mode=mode)
+        assert batch['lots'][i] == one['lots']
+        assert batch['stop'][i] == pytest.approx(one['stop'])
+        assert batch['target'][i] == pytest.approx(one['target'])
+    assert compute_option_positions([], "BUY", 5000, 75, mode)['lots'].shape == (0,)
@@ -1,4 +1,6 @@
 
+import asyncio
+
 import pytest
 
 from src.services.options.options_manager import OptionsManager
@@ -10,7 +12,7 @@ class DummyRest:
     def __init__(self):
         self._calls = 0
         self.ts = now_ist().replace(hour=10, minute=0, second=0, microsecond=0)  # Fixed ts for test
-    def get_option_chain(self, instrument_symbol):
+    async def get_option_chain(self, instrument_symbol):
         self._calls += 1
         return [
             {"symbol":"NIFTY","strike":24000,"type":"CE","expiry":self.ts.isoformat(),"oi":120000,"iv":15.0,"ltp":120.0,"bid":119.5,"ask":120.5},
@@ -21,7 +23,7 @@ class DummyRest:
             {"strike":24000,"kind":"CALL","expiry":self.ts.isoformat(),"trading_symbol":"NIFTY25OCT24000CE"},
             {"strike":24000,"kind":"PUT","expiry":self.ts.isoformat(),"trading_symbol":"NIFTY25OCT24000PE"}
         ]
-    def get_underlying_price(self, instrument_symbol):
+    async def get_underlying_price(self, instrument_symbol):
         return {"last_price":23995}
 
 async def _collector(signal_list, sig):
@@ -42,4 +44,165 @@ async def test_manager_basic():
     assert collected[0].trading_symbol == "NIFTY25OCT24000CE", "Expected mapped trading symbol for call option"
     assert collected[0].contract_symbol == "NIFTY", "Contract symbol should be underlying"
 
-# Additional tests for cooldown/debounce could be added.
+@pytest.mark.asyncio
+async def test_manager_debounces_chain_fetch():
+    rest = DummyRest()
+    provider = OptionsChainProvider(rest)
+    provider.set_instrument("NIFTY")
+    collected = []
+    cfg = {"OPTION_ENABLE": True, "OPTION_RISK_CAP_PER_TRADE": 100000, "OPTION_LOT_SIZE": 1, "OPTION_DEBOUNCE_INTRADAY_SEC": 60}
+    async def callback(sig):
+        await _collector(collected, sig)
+    mgr = OptionsManager(provider, cfg, callback)
+    # Opposite sides so cooldown does not suppress the second signal
+    await mgr.publish_underlying_signal(symbol="Nifty 50", side="BUY", price=23995, timeframe="5m", origin="intraday")
+    await mgr.publish_underlying_signal(symbol="Nifty 50", side="SELL", price=23995, timeframe="5m", origin="intraday")
+    assert len(collected) == 2
+    assert rest._calls == 1, "Second signal inside debounce window should reuse cached chain"
+
+@pytest.mark.asyncio
+async def test_manager_reuses_ranking_for_same_snapshot():
+    rest = DummyRest()
+    provider = OptionsChainProvider(rest)
+    provider.set_instrument("NIFTY")
+    collected = []
+    cfg = {"OPTION_ENABLE": True, "OPTION_RISK_CAP_PER_TRADE": 100000, "OPTION_LOT_SIZE": 1, "OPTION_DEBOUNCE_INTRADAY_SEC": 60}
+    async def callback(sig):
+        await _collector(collected, sig)
+    mgr = OptionsManager(provider, cfg, callback)
+    await mgr.publish_underlying_signal(symbol="Nifty 50", side="BUY", price=23995, timeframe="5m", origin="intraday")
+    await mgr.publish_underlying_signal(symbol="Nifty 50", side="SELL", price=23995, timeframe="5m", origin="intraday")
+    # Same ATM strike as the first BUY, so the ranking is served from the snapshot cache
+    await mgr.publish_underlying_signal(symbol="Nifty 50", side="BUY", price=24010, timeframe="5m", origin="intraday")
+    assert len(collected) == 3
+    snapshot_id, ranks = mgr._rank_cache[("Nifty 50", "intraday")]
+    assert snapshot_id == mgr._chain_cache[("Nifty 50", "intraday")][3]
+    assert len(ranks) == 2
+
+@pytest.mark.asyncio
+async def test_manager_batch_emits_once_per_side_with_shared_fetch():
+    rest = DummyRest()
+    provider = OptionsChainProvider(rest)
+    provider.set_instrument("NIFTY")
+    collected = []
+    cfg = {"OPTION_ENABLE": True, "OPTION_RISK_CAP_PER_TRADE": 100000, "OPTION_LOT_SIZE": 1, "OPTION_DEBOUNCE_INTRADAY_SEC": 60}
+    async def callback(sig):
+        await _collector(collected, sig)
+    mgr = OptionsManager(provider, cfg, callback)
+    signal = {"symbol": "Nifty 50", "side": "BUY", "price": 23995, "timeframe": "5m", "origin": "intraday"}
+    results = await mgr.publish_underlying_signals_batch([signal, dict(signal, price=24005)])
+    # Both signals pass the first cooldown check; the re-check after the shared fetch stops the second
+    assert results == [None, None]
+    assert len(collected) == 1
+    assert rest._calls == 1
+
+@pytest.mark.asyncio
+async def test_provider_refresh_fetches_chain_price_and_symbols():
+    rest = DummyRest()
+    provider = OptionsChainProvider(rest)
+    provider.set_instrument("NIFTY")
+    chain, futures_price = await provider.refresh()
+    assert futures_price == 23995.0
+    assert sorted(c.trading_symbol for c in chain) == ["NIFTY25OCT24000CE", "NIFTY25OCT24000PE"]
+    assert rest._calls == 1
+
+
+@pytest.mark.asyncio
+async def test_provider_caches_contract_metadata():
+    rest = DummyRest()
+    calls = []
+    fetch = rest.get_option_contracts
+    rest.get_option_contracts = lambda sym: calls.append(sym) or fetch(sym)
+    provider = OptionsChainProvider(rest)
+    provider.set_instrument("NIFTY")
+    await provider.fetch_option_chain()
+    chain = await provider.fetch_option_chain()
+    assert calls == ["NIFTY"]
+    assert all(c.trading_symbol for c in chain)
+
+
+@pytest.mark.asyncio
+async def test_provider_shares_concurrent_contract_fetch():
+    rest = DummyRest()
+    calls = []
+    fetch = rest.get_option_contracts
+    rest.get_option_contracts = lambda sym: calls.append(sym) or fetch(sym)
+    provider = OptionsChainProvider(rest)
+    provider.set_instrument("NIFTY")
+    first, second = await asyncio.gather(provider._fetch_option_contracts(), provider._fetch_option_contracts())
+    assert calls == ["NIFTY"]
+    assert first == second
+
+def test_parse_raw_chain_casts_columns_and_drops_bad_rows():
+    import pandas as pd
+
+    provider = OptionsChainProvider(DummyRest())
+    ts_now = now_ist()
+    raw = [
+        {"symbol": "NSE_FO|1", "strike": 24000.0, "type": "ce", "expiry": "2025-01-30", "oi": 10, "iv": 12.5,
+         "ltp": 100.0, "bid": 99.5, "ask": 100.5, "delta": 0.5},
+        {"symbol": "NSE_FO|2", "strike": "24050", "type": "PE", "expiry": None, "oi": None, "ltp": 80.0},
+        {"symbol": "NSE_FO|3", "strike": None, "type": "CE", "expiry": "2025-01-30"},
+        {"symbol": "NSE_FO|4", "strike": 24100, "type": "CE", "expiry": "not a date"},
+    ]
+    first = provider._parse_raw_chain(raw, ts_now)
+    assert [(c.symbol, c.strike, c.kind) for c in first] == [("NSE_FO|1", 24000, "CALL"), ("NSE_FO|2", 24050, "PUT")]
+    call, put = first
+    assert call.expiry == pd.Timestamp("2025-01-30") and put.expiry is ts_now
+    assert (call.oi, call.iv, call.bid, call.delta, call.gamma) == (10, 12.5, 99.5, 0.5, None)
+    assert (put.oi, put.iv, put.bid, put.ask, put.delta) == (0, 0.0, 80.0, 80.0, None)
+    assert isinstance(call.strike, int) and isinstance(call.oi, int)
+    assert provider.dropped_rows == 2
+    provider._last_chain = {c.symbol: c for c in first}
+    assert provider._parse_raw_chain(raw, ts_now)[0].oi_prev == 10
+
+@pytest.mark.asyncio
+async def test_chain_arrays_match_contracts_and_metrics():
+    from src.services.options.options_chain_analyzer import (compute_chain_metrics,
+                                                      compute_chain_metrics_arrays)
+    provider = OptionsChainProvider(DummyRest())
+    provider.set_instrument("NIFTY")
+    chain = await provider.fetch_option_chain()
+    arrays = provider.get_chain_arrays()
+    assert arrays["oi"].tolist() == [c.oi for c in chain]
+    assert arrays["strike"].dtype == "int64" and arrays["iv"].dtype == "float64"
+    assert compute_chain_metrics_arrays(arrays) == pytest.approx(compute_chain_metrics(chain))
+    assert compute_chain_metrics_arrays(OptionsChainProvider(DummyRest()).get_chain_arrays()) == {}
+
+@pytest.mark.asyncio
+async def test_provider_can_skip_trading_symbols_and_keeps_rho():
+    rest = DummyRest()
+    chain_rows = await rest.get_option_chain("NIFTY")
+    async def chain_with_rho(sym):
+        return [dict(r, rho=0.05) for r in chain_rows]
+    rest.get_option_chain = chain_with_rho
+    rest.get_option_contracts = lambda sym: pytest.fail("contract metadata should not be fetched")
+    provider = OptionsChainProvider(rest, "NIFTY", enable_trading_symbols=False)
+    chain = await provider.fetch_option_chain()
+    assert [c.rho for c in chain] == [0.05, 0.05]
+    assert all(c.trading_symbol is None for c in chain)
+
+@pytest.mark.asyncio
+async def test_trading_symbol_index_is_reused_until_universe_changes():
+    rest = DummyRest()
+    calls = []
+    fetch = rest.get_option_contracts
+    rest.get_option_contracts = lambda sym: calls.append(sym) or fetch(sym)
+    provider = OptionsChainProvider(rest, "NIFTY")
+    await provider.fetch_option_chain()
+    chain = await provider.fetch_option_chain()
+    assert len(calls) == 1 and all(c.trading_symbol for c in chain)
+    # A newly listed strike: the contract metadata cache (still within its TTL) must not hide it
+    rows = await DummyRest().get_option_chain("NIFTY")
+    async def wider_chain(sym):
+        return rows + [dict(rows[0], strike=24050)]
+    rest.get_option_chain = wider_chain
+    def wider_contracts(sym):
+        calls.append(sym)
+        return fetch(sym) + [dict(fetch(sym)[0], strike=24050, trading_symbol="NIFTY25OCT24050CE")]
+    rest.get_option_contracts = wider_contracts
+    chain = await provider.fetch_option_chain()
+    assert len(calls) == 2
+    assert sorted(c.trading_symbol for c in chain) == ["NIFTY25OCT24000CE", "NIFTY25OCT24000PE", "NIFTY25OCT24050CE"]
+
+# Additional tests for cooldown could be added.
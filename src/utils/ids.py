@@ -0,0 +1,24 @@
+import os
+import time
+import uuid
+
+
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (version 7): 48-bit unix ms timestamp followed by 74 random bits.
+
+    Successive ids sort by creation time, so inserts land at the right edge of a B-tree index.
+    """
+    ts_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), 'big')
+    rand_a = rand >> 68                     # 12 bits
+    rand_b = rand & ((1 << 62) - 1)         # 62 bits
+    value = (ts_ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76                      # version
+    value |= rand_a << 64
+    value |= 0b10 << 62                     # RFC 4122 variant
+    value |= rand_b
+    return uuid.UUID(int=value)
+
+
+def uuid7_str() -> str:
+    return str(uuid7())
@@ -1,6 +1,10 @@
+import functools
 import json
 import logging
 import os
+import sys
+from types import MappingProxyType
+from typing import Mapping
 
 logger = logging.getLogger(__name__)
 
@@ -91,8 +95,13 @@ def resolve_instrument_key(input_symbol_category: str):
     logger.warning("resolve_instrument_key() is deprecated. Use resolve_instruments() instead.")
     return resolve_instruments(input_symbol_category)
 
-def get_symbol_to_key_mapping():
-    """Create a flat mapping of symbol to instrument key for quick lookup."""
+@functools.lru_cache(maxsize=1)
+def get_symbol_to_key_mapping() -> Mapping[str, str]:
+    """Create a flat mapping of symbol to instrument key for quick lookup.
+
+    Loaded once per process and shared as a read-only view; call get_symbol_to_key_mapping.cache_clear()
+    after editing the instruments file.
+    """
     instruments = load_instruments()
     symbol_map = {}
     
@@ -100,6 +109,7 @@ def get_symbol_to_key_mapping():
     for category, category_instruments in instruments.items():
         if isinstance(category_instruments, dict):
             for symbol_desc, key in category_instruments.items():
-                symbol_map[symbol_desc] = key
+                # Interned so order-path lookups mostly hit on identity
+                symbol_map[sys.intern(symbol_desc)] = sys.intern(key)
     
-    return symbol_map
\ No newline at end of file
+    return MappingProxyType(symbol_map)
\ No newline at end of file
@@ -9,4 +9,14 @@ class Product(Enum):
 
 class Validity(Enum):
     DAY = "DAY"  # Order valid for the entire trading day
-    IOC = "IOC"  # Immediate or Cancel (executes immediately or gets cancelled)
\ No newline at end of file
+    IOC = "IOC"  # Immediate or Cancel (executes immediately or gets cancelled)
+
+class OrderType(Enum):
+    MARKET = "MARKET"  # Execute at best available price
+    LIMIT = "LIMIT"  # Execute at the given price or better
+    SL = "SL"  # Stop-loss limit
+    SL_M = "SL-M"  # Stop-loss market
+
+class TransactionType(Enum):
+    BUY = "BUY"
+    SELL = "SELL"